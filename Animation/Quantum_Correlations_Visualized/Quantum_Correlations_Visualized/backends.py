@@ -0,0 +1,149 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+#---------------------------------------------------------------------
+#
+# Interchangeable backends for simulating the counts of a run: the
+# pure Python countData, NumPy, and Numba. A backend is loaded only
+# when chosen, so one not chosen costs nothing at startup, and one
+# that cannot run here falls back to the next fastest.
+#
+#---------------------------------------------------------------------
+
+import os
+import sys
+from collections import namedtuple
+from math import sin, cos
+
+# A backend's countData(ζ1, ζ2, runLength, rng) returns the eight
+# counts in the order of simulation.countData, seeding whatever
+# generator it uses from rng, so that seeding rng governs it too.
+Backend = namedtuple('Backend', ['name', 'countData'])
+
+# The environment variable naming the backend, unless a flag does.
+environment_variable = 'QUANTUM_CORRELATIONS_BACKEND'
+
+# Events drawn at a time by the array backends, so memory stays
+# bounded however long the run.
+chunk_size = 1 << 20
+
+def probabilities(ζ1, ζ2):
+    """The probabilities of + at detectors 1 and 2, for a horizontal
+    and for a vertical photon 1."""
+    return ((cos(ζ1) ** 2, sin(ζ2) ** 2),
+            (sin(ζ1) ** 2, cos(ζ2) ** 2))
+
+def load_python():
+    from .simulation import countData
+    return (lambda ζ1, ζ2, runLength, rng:
+            countData(ζ1, ζ2, runLength, 'plain', rng))
+
+def load_numpy():
+    import numpy
+
+    def countData(ζ1, ζ2, runLength, rng):
+        generator = numpy.random.default_rng(rng.getrandbits(64))
+        ((h1, h2), (v1, v2)) = probabilities(ζ1, ζ2)
+        p1 = numpy.array([h1, v1])
+        p2 = numpy.array([h2, v2])
+        counts = numpy.zeros(8, numpy.int64)
+        for start in range(0, runLength, chunk_size):
+            n = min(chunk_size, runLength - start)
+            # 0 is horizontal, 1 vertical; likewise 0 is + and 1 is −.
+            σ = (generator.random(n) >= 0.5).astype(numpy.intp)
+            τ1 = (generator.random(n) >= p1[σ])
+            τ2 = (generator.random(n) >= p2[σ])
+            counts += numpy.bincount(4 * σ + 2 * τ1 + τ2, minlength=8)
+        return tuple(int(n) for n in counts)
+
+    return countData
+
+def load_numba():
+    import numba
+    import numpy
+
+    @numba.njit
+    def count_chunk(h1, h2, v1, v2, n, seed):
+        numpy.random.seed(seed)
+        counts = numpy.zeros(8, numpy.int64)
+        for i in range(n):
+            if numpy.random.random() < 0.5:
+                (σ, p1, p2) = (0, h1, h2)
+            else:
+                (σ, p1, p2) = (1, v1, v2)
+            τ1 = (0 if numpy.random.random() < p1 else 1)
+            τ2 = (0 if numpy.random.random() < p2 else 1)
+            counts[4 * σ + 2 * τ1 + τ2] += 1
+        return counts
+
+    count_chunk(1.0, 0.0, 0.0, 1.0, 1, 0)   # Compile it now.
+
+    def countData(ζ1, ζ2, runLength, rng):
+        ((h1, h2), (v1, v2)) = probabilities(ζ1, ζ2)
+        counts = [0] * 8
+        for start in range(0, runLength, chunk_size):
+            n = min(chunk_size, runLength - start)
+            chunk = count_chunk(h1, h2, v1, v2, n, rng.getrandbits(32))
+            for i in range(8):
+                counts[i] += int(chunk[i])
+        return tuple(counts)
+
+    return countData
+
+backends = {'python': load_python,
+            'numpy': load_numpy,
+            'numba': load_numba}
+
+# Fastest first. 'auto' is the first of these that can run here, and
+# a backend that cannot run falls back to the next.
+fastest_backends = ('numba', 'numpy', 'python')
+
+backend_names = (*backends, 'auto')
+
+loaded_backends = {}
+
+def get_backend(name=None):
+    """Return the Backend for the name given, or else for the name in
+    the environment variable, or else the python backend. A warning is
+    printed, once, if a backend named explicitly cannot run here."""
+    if name is None:
+        name = os.environ.get(environment_variable, 'python')
+    if name in loaded_backends:
+        return loaded_backends[name]
+    if name == 'auto':
+        candidates = fastest_backends
+    elif name in fastest_backends:
+        candidates = fastest_backends[fastest_backends.index(name):]
+    else:
+        raise ValueError(f'unknown backend {name!r}')
+    for candidate in candidates:
+        try:
+            backend = Backend(candidate, backends[candidate]())
+        except ImportError as error:
+            if name != 'auto':
+                print(f'the {candidate} backend cannot run here ({error})',
+                      file=sys.stderr)
+            continue
+        loaded_backends[name] = backend
+        loaded_backends[candidate] = backend
+        return backend
@@ -0,0 +1,85 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+#---------------------------------------------------------------------
+#
+# A cache of simulated counts.
+#
+# The channels turn at constant speed, so after the first revolution
+# the animation is only revisiting angle pairs it has simulated
+# before. The cache rounds φ1 and φ2 − φ1 to a grid, and keeps the
+# counts simulated for each grid point. Several count vectors may be
+# kept per grid point and handed out in turn, so the display does not
+# lose its statistical noise.
+#
+# The counts are simulated at the grid angles themselves. Where the
+# estimator's quadrant signs change, the square root they multiply is
+# near zero, so the rounding changes an estimate only by about the
+# grid spacing.
+#
+#---------------------------------------------------------------------
+
+from collections import OrderedDict
+from math import pi
+
+two_π = 2.0 * pi
+
+class CountsCache:
+
+    def __init__(self, countData, resolution, maxsize=4096, depth=1):
+        """Cache countData(φ1, φ2, runLength) on a grid of about the
+        given resolution in radians, holding at most maxsize grid
+        points, each with up to depth count vectors. The least
+        recently used grid point is dropped first."""
+        self.countData = countData
+        self.steps = max(1, round(two_π / resolution))
+        self.resolution = two_π / self.steps
+        self.maxsize = maxsize
+        self.depth = depth
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, φ1, φ2, runLength):
+        i1 = round(φ1 / self.resolution) % self.steps
+        iΔ = round((φ2 - φ1) / self.resolution) % self.steps
+        key = (i1, iΔ, runLength)
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = [[], 0]
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        else:
+            self.entries.move_to_end(key)
+        (vectors, turn) = entry
+        if len(vectors) < self.depth:
+            self.misses += 1
+            ψ1 = i1 * self.resolution
+            ψ2 = ψ1 + iΔ * self.resolution
+            counts = self.countData(ψ1, ψ2, runLength)
+            vectors.append(counts)
+        else:
+            self.hits += 1
+            counts = vectors[turn % self.depth]
+            entry[1] = turn + 1
+        return counts
@@ -0,0 +1,73 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+#---------------------------------------------------------------------
+#
+# Running the animation without a display.
+#
+# The experiment is stepped exactly as the window would step it, but
+# as fast as the machine allows, and the readings are written to a
+# file instead of drawn.
+#
+#---------------------------------------------------------------------
+
+import csv
+import sys
+from .simulation import Reading
+
+def readings(model, duration, Δt):
+    """Step the model through the given duration, frame by frame,
+    yielding the Readings (or for BellTests, the PanelReadings)."""
+    for i in range(round(duration / Δt)):
+        reading = model.step(Δt)
+        if isinstance(reading, list):
+            yield from reading
+        elif reading is not None:
+            yield reading
+
+def write_csv(readings, file, fields=Reading._fields):
+    writer = csv.writer(file)
+    writer.writerow(fields)
+    for reading in readings:
+        writer.writerow(reading)
+
+def write_npz(readings, path, fields=Reading._fields):
+    """Write the readings as a NumPy .npz archive, one array per
+    field."""
+    import numpy
+    table = numpy.array(list(readings), dtype=float)
+    table = table.reshape(-1, len(fields))
+    numpy.savez(path, **{name: table[:, i]
+                         for (i, name) in enumerate(fields)})
+
+def run_headless(model, duration, Δt, output=None):
+    """Write the readings to output, as NPZ if the file name ends in
+    .npz and otherwise as CSV. Without an output file, write CSV to
+    standard output."""
+    if output is None:
+        write_csv(readings(model, duration, Δt), sys.stdout, model.fields)
+    elif output.endswith('.npz'):
+        write_npz(readings(model, duration, Δt), output, model.fields)
+    else:
+        with open(output, 'w', newline='') as file:
+            write_csv(readings(model, duration, Δt), file, model.fields)
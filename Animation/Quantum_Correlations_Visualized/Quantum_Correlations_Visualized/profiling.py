@@ -0,0 +1,185 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+#---------------------------------------------------------------------
+#
+# Opt-in instrumentation.
+#
+# Code that can be profiled holds a profiler that is None unless
+# profiling was asked for, and checks for None before timing anything,
+# so when profiling is off the cost is one comparison per frame.
+#
+#---------------------------------------------------------------------
+
+import json
+import tracemalloc
+from bisect import bisect_right
+from collections import deque
+from contextlib import nullcontext
+from random import Random
+from time import perf_counter
+
+# Upper edges, in milliseconds, of the frame-time histogram's bins;
+# the last bin is unbounded.
+frame_bins = (1, 2, 4, 8, 16, 17, 20, 33, 50, 100, 200)
+
+def timed(profiler, name, events=0):
+    """Return profiler.stage(name, events), or a context manager that
+    does nothing if profiler is None."""
+    return untimed if profiler is None else profiler.stage(name, events)
+
+untimed = nullcontext()
+
+class Stage:
+    """Accumulated wall time of one stage of the work."""
+
+    __slots__ = ('calls', 'seconds', 'events', 'started')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.events = 0
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, *exception):
+        self.seconds += perf_counter() - self.started
+        self.calls += 1
+
+class FrameTimes:
+    """A histogram of frame times, with the newest hundred times kept
+    for the overlay, and a uniform sample of all of them, up to a
+    limit, for percentiles."""
+
+    def __init__(self, limit=100000):
+        self.counts = [0] * (len(frame_bins) + 1)
+        self.frames = 0
+        self.recent = deque(maxlen=100)
+        self.sample = []
+        self.limit = limit
+        self.maximum = None
+        self.rng = Random(0)
+
+    def add(self, seconds):
+        ms = 1000.0 * seconds
+        self.counts[bisect_right(frame_bins, ms)] += 1
+        self.frames += 1
+        self.recent.append(ms)
+        if self.maximum is None or ms > self.maximum:
+            self.maximum = ms
+        # Reservoir sampling: the nth time replaces a random one of
+        # the sample with probability limit/n.
+        if len(self.sample) < self.limit:
+            self.sample.append(ms)
+        else:
+            i = self.rng.randrange(self.frames)
+            if i < self.limit:
+                self.sample[i] = ms
+
+    def report(self):
+        times = sorted(self.sample)
+        def percentile(q):
+            return times[min(len(times) - 1, int(q * len(times)))]
+        edges = [f'<{b}' for b in frame_bins] + [f'>={frame_bins[-1]}']
+        return {'frames': self.frames,
+                'histogram_ms': dict(zip(edges, self.counts)),
+                'p50_ms': percentile(0.50) if times else None,
+                'p90_ms': percentile(0.90) if times else None,
+                'p99_ms': percentile(0.99) if times else None,
+                'max_ms': self.maximum}
+
+class Profiler:
+    """Per-stage wall time and events per second, frame-time
+    histograms, and, with trace_memory, the tracemalloc peak (which
+    slows allocation-heavy code a good deal, so it is off unless
+    asked for)."""
+
+    def __init__(self, trace_memory=False):
+        self.stages = {}
+        self.frames = {}
+        self.started = perf_counter()
+        self.trace_memory = trace_memory
+        if trace_memory:
+            tracemalloc.start()
+
+    def stage(self, name, events=0):
+        """Return a context manager that charges its time, and the
+        given number of events, to the named stage."""
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = Stage()
+        stage.events += events
+        return stage
+
+    def frame(self, name, seconds):
+        times = self.frames.get(name)
+        if times is None:
+            times = self.frames[name] = FrameTimes()
+        times.add(seconds)
+
+    def report(self):
+        wall = perf_counter() - self.started
+        report = {'wall_seconds': wall, 'stages': {}, 'frames': {}}
+        for (name, stage) in self.stages.items():
+            report['stages'][name] = {
+                'calls': stage.calls,
+                'seconds': stage.seconds,
+                'share': stage.seconds / wall if wall > 0 else None,
+                'events': stage.events,
+                'events_per_second': (stage.events / stage.seconds
+                                      if stage.events and stage.seconds > 0
+                                      else None)}
+        for (name, times) in self.frames.items():
+            report['frames'][name] = times.report()
+        if self.trace_memory:
+            (current, peak) = tracemalloc.get_traced_memory()
+            report['tracemalloc'] = {'current_bytes': current,
+                                     'peak_bytes': peak}
+        return report
+
+    def summary(self):
+        """A few lines for an on-screen overlay."""
+        lines = []
+        for (name, stage) in self.stages.items():
+            if stage.calls == 0:
+                continue
+            line = f'{name}: {1000.0 * stage.seconds / stage.calls:.2f} ms'
+            if stage.events and stage.seconds > 0:
+                line += f', {stage.events / stage.seconds:,.0f} events/s'
+            lines.append(line)
+        for (name, times) in self.frames.items():
+            if times.recent:
+                recent = sorted(times.recent)
+                lines.append(f'{name} p50 {recent[len(recent) // 2]:.1f} ms')
+        if self.trace_memory:
+            lines.append(f'peak memory '
+                         f'{tracemalloc.get_traced_memory()[1] / 1024:,.0f} KiB')
+        return lines
+
+    def write(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=2)
+            file.write('\n')
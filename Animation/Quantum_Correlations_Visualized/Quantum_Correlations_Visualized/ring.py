@@ -0,0 +1,147 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+#---------------------------------------------------------------------
+#
+# Simulation in a worker process.
+#
+# The producer process simulates counts for the angles the window
+# will have reached by the time it is done, and publishes them in a
+# ring of slots in shared memory. The window only reads the latest
+# finished slot, so the frame rate no longer depends on how long the
+# simulation takes.
+#
+# There is one writer and one reader, and no lock. A slot is marked
+# unfinished before it is written and stamped with its sequence number
+# after; the reader copies a slot and then checks that the stamp is
+# unchanged. Every field is an aligned 8-byte double.
+#
+#---------------------------------------------------------------------
+
+from multiprocessing import Process
+from multiprocessing.shared_memory import SharedMemory
+from time import perf_counter
+
+# Header fields.
+PUBLISHED = 0                   # sequence number of the latest slot
+REQUESTED = 1                   # the reader's current time
+STOP = 2                        # nonzero tells the producer to quit
+HEADER_SIZE = 3
+
+# Slot fields: sequence number, time, φ1, φ2, and the eight counts.
+SLOT_SIZE = 12
+UNFINISHED = -1.0
+
+class CountsRing:
+
+    def __init__(self, name=None, slots=8):
+        """Create a new ring, or attach to an existing one by name."""
+        self.slots = slots
+        self.shm = SharedMemory(name=name, create=(name is None),
+                                size=8 * (HEADER_SIZE + slots * SLOT_SIZE))
+        self.cells = self.shm.buf.cast('d')
+        if name is None:
+            self.cells[PUBLISHED] = -1.0
+            self.cells[REQUESTED] = 0.0
+            self.cells[STOP] = 0.0
+            for i in range(slots):
+                self.cells[self.slot_base(i)] = UNFINISHED
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def slot_base(self, sequence):
+        return HEADER_SIZE + (sequence % self.slots) * SLOT_SIZE
+
+    def publish(self, t, φ1, φ2, counts):
+        """Write a result into the next slot (producer side)."""
+        sequence = int(self.cells[PUBLISHED]) + 1
+        base = self.slot_base(sequence)
+        self.cells[base] = UNFINISHED
+        self.cells[base + 1] = t
+        self.cells[base + 2] = φ1
+        self.cells[base + 3] = φ2
+        for i in range(8):
+            self.cells[base + 4 + i] = counts[i]
+        self.cells[base] = float(sequence)
+        self.cells[PUBLISHED] = float(sequence)
+
+    def latest(self):
+        """Return (t, φ1, φ2, counts) from the latest finished slot,
+        or None if there is none yet (consumer side)."""
+        sequence = self.cells[PUBLISHED]
+        if sequence < 0.0:
+            return None
+        base = self.slot_base(int(sequence))
+        values = self.cells[base : base + SLOT_SIZE].tolist()
+        if values[0] != sequence or self.cells[base] != sequence:
+            return None         # Overwritten while we were reading.
+        return (values[1], values[2], values[3],
+                tuple(int(n) for n in values[4:]))
+
+    def request(self, t):
+        self.cells[REQUESTED] = t
+
+    def requested(self):
+        return self.cells[REQUESTED]
+
+    def stop(self):
+        self.cells[STOP] = 1.0
+
+    def stopped(self):
+        return self.cells[STOP] != 0.0
+
+    def close(self):
+        self.cells.release()
+        self.shm.close()
+
+def produce(name, angles, countData, runLength):
+    """The producer process's main loop. angles(t) gives (φ1, φ2) at
+    time t."""
+    ring = CountsRing(name)
+    latency = 0.0
+    while not ring.stopped():
+        start = perf_counter()
+        # Aim for where the reader will be when we are done.
+        t = ring.requested() + latency
+        (φ1, φ2) = angles(t)
+        ring.publish(t, φ1, φ2, countData(φ1, φ2, runLength))
+        latency = perf_counter() - start
+    ring.close()
+
+class SimulationWorker:
+    """A producer process together with the ring it publishes to."""
+
+    def __init__(self, angles, countData, runLength):
+        self.ring = CountsRing()
+        self.process = Process(target=produce, daemon=True,
+                               args=(self.ring.name, angles, countData,
+                                     runLength))
+        self.process.start()
+
+    def stop(self):
+        self.ring.stop()
+        self.process.join()
+        self.ring.close()
+        self.ring.shm.unlink()
@@ -0,0 +1,239 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+#---------------------------------------------------------------------
+#
+# A local service answering estimate_ρ and detector_dial_settings
+# queries, so that tools need not each start a Python process and
+# simulate from cold.
+#
+# It speaks just enough HTTP/1.0, on localhost or on a Unix socket:
+#
+#   GET /estimate?phi1=DEG&phi2=DEG&run_length=N&seed=S&sampler=NAME
+#   GET /stats
+#
+# and answers with JSON. Simulations run on a process pool. A result
+# depends only on (φ1, φ2, runLength, seed, sampler), so identical
+# requests arriving while one is being computed all wait on that one
+# computation, and finished results are kept in a bounded LRU cache.
+#
+#---------------------------------------------------------------------
+
+import asyncio
+import json
+import os
+from argparse import ArgumentParser
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from math import isfinite
+from multiprocessing import get_context
+from urllib.parse import urlsplit, parse_qs
+from .backends import backend_names, environment_variable, get_backend
+from .simulation import π_180, samplers, Simulator, estimate_ρ
+
+def compute(backend, φ1_degrees, φ2_degrees, runLength, seed_value,
+            sampler):
+    """Simulate and estimate, in a worker process."""
+    (φ1, φ2) = (φ1_degrees * π_180, φ2_degrees * π_180)
+    counts = Simulator(seed_value, sampler,
+                       backend).countData(φ1, φ2, runLength)
+    return {'phi1': φ1_degrees, 'phi2': φ2_degrees,
+            'run_length': runLength, 'seed': seed_value,
+            'sampler': sampler, 'backend': backend,
+            'counts': list(counts),
+            'rho': estimate_ρ(counts, φ1, φ2),
+            'detector_dial_settings': meter_readings(counts)}
+
+def meter_readings(counts):
+    """The readings of detector_dial_settings, but None (null in JSON)
+    for a meter that no photons reached, as may happen in a short
+    run."""
+    (n_hpp, n_hpm, n_hmp, n_hmm,
+     n_vpp, n_vpm, n_vmp, n_vmm) = counts
+    return [(plus / (plus + minus) if plus + minus else None)
+            for (plus, minus) in ((n_hpp + n_hpm, n_hmp + n_hmm),
+                                  (n_hpp + n_hmp, n_hpm + n_hmm),
+                                  (n_vpp + n_vpm, n_vmp + n_vmm),
+                                  (n_vpp + n_vmp, n_vpm + n_vmm))]
+
+class BadRequest(Exception):
+    pass
+
+class EstimationService:
+
+    def __init__(self, workers=None, cache_size=1024,
+                 max_run_length=10 ** 8, backend=None):
+        self.backend = get_backend(backend).name
+        # Workers are spawned rather than forked, lest they inherit the
+        # sockets of open connections and hold them open.
+        self.executor = ProcessPoolExecutor(workers, get_context('spawn'))
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.max_run_length = max_run_length
+        self.in_flight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def estimate(self, φ1, φ2, runLength, seed_value=0,
+                       sampler='plain'):
+        """Return the result for the given query, in degrees, from the
+        cache, from a computation already under way, or from a new
+        one."""
+        key = (float(φ1), float(φ2), runLength, seed_value, sampler)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return dict(self.cache[key], cached=True)
+        if key in self.in_flight:
+            self.coalesced += 1
+            return dict(await asyncio.shield(self.in_flight[key]),
+                        cached=False)
+        self.misses += 1
+        future = asyncio.get_running_loop().run_in_executor(
+            self.executor, compute, self.backend, *key)
+        self.in_flight[key] = future
+        try:
+            result = await asyncio.shield(future)
+        finally:
+            del self.in_flight[key]
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return dict(result, cached=False)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'coalesced': self.coalesced,
+                'in_flight': len(self.in_flight),
+                'cached': len(self.cache)}
+
+    def parse_query(self, query):
+        fields = {name: values[-1]
+                  for (name, values) in parse_qs(query).items()}
+        try:
+            φ1 = float(fields['phi1'])
+            φ2 = float(fields['phi2'])
+            runLength = int(fields.get('run_length', 10000))
+            seed_value = int(fields.get('seed', 0))
+        except KeyError as missing:
+            raise BadRequest(f'missing parameter {missing}')
+        except ValueError as error:
+            raise BadRequest(str(error))
+        if not (isfinite(φ1) and isfinite(φ2)):
+            raise BadRequest('phi1 and phi2 must be finite')
+        sampler = fields.get('sampler', 'plain')
+        if sampler != 'multinomial' and sampler not in samplers:
+            raise BadRequest(f'unknown sampler {sampler!r}')
+        if not 1 <= runLength <= self.max_run_length:
+            raise BadRequest(f'run_length must be from 1 to '
+                             f'{self.max_run_length}')
+        return (φ1, φ2, runLength, seed_value, sampler)
+
+    async def respond(self, request):
+        """Return the status and JSON body answering a request line."""
+        try:
+            (method, target, *version) = request.decode('latin1').split()
+        except ValueError:
+            return ('400 Bad Request', {'error': 'malformed request'})
+        if method != 'GET':
+            return ('405 Method Not Allowed',
+                    {'error': f'method {method} not allowed'})
+        url = urlsplit(target)
+        if url.path == '/stats':
+            return ('200 OK', self.stats())
+        if url.path != '/estimate':
+            return ('404 Not Found', {'error': f'no such path {url.path}'})
+        try:
+            query = self.parse_query(url.query)
+        except BadRequest as error:
+            return ('400 Bad Request', {'error': str(error)})
+        try:
+            return ('200 OK', await self.estimate(*query))
+        except Exception as error:
+            # A failed computation fails every request waiting on it,
+            # and none of it is cached.
+            return ('500 Internal Server Error',
+                    {'error': f'{type(error).__name__}: {error}'})
+
+    async def handle(self, reader, writer):
+        try:
+            request = await reader.readline()
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass            # Headers are ignored.
+            (status, body) = await self.respond(request)
+            data = json.dumps(body).encode('utf-8')
+            writer.write(f'HTTP/1.0 {status}\r\n'
+                         f'Content-Type: application/json\r\n'
+                         f'Content-Length: {len(data)}\r\n'
+                         f'\r\n'.encode('latin1') + data)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8765, unix=None):
+        if unix is not None:
+            server = await asyncio.start_unix_server(self.handle, unix)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown()
+
+def main():
+    parser = ArgumentParser(
+        prog='Quantum-Correlations-Service',
+        description='Serve estimates of the correlation coefficient and '
+        'detector predominances over HTTP, on localhost or a Unix '
+        'socket: GET /estimate?phi1=DEG&phi2=DEG&run_length=N&seed=S'
+        '&sampler=NAME, or GET /stats.')
+    parser.add_argument('--port', type=int, default=8765,
+                        help='the localhost port (default 8765)')
+    parser.add_argument('--unix', metavar='PATH',
+                        help='listen on a Unix socket instead')
+    parser.add_argument('--workers', type=int,
+                        help='simulation processes (default one per CPU)')
+    parser.add_argument('--cache-size', type=int, default=1024,
+                        help='results to keep (default 1024)')
+    parser.add_argument('--backend', choices=backend_names,
+                        help='the backend for the plain sampler '
+                        f'(default from {environment_variable}, or '
+                        'python)')
+    parser.add_argument('--max-run-length', type=int, default=10 ** 8,
+                        help='the longest run to accept (default 10^8)')
+    args = parser.parse_args()
+    service = EstimationService(args.workers, args.cache_size,
+                                args.max_run_length, args.backend)
+    try:
+        asyncio.run(service.serve(port=args.port, unix=args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+        if args.unix is not None and os.path.exists(args.unix):
+            os.remove(args.unix)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+#---------------------------------------------------------------------
+#
+# Runs too long for one machine, split into shards.
+#
+# A shared directory (NFS or the like) serves as the work queue:
+#
+#   plan.json     the angle pairs, run lengths, seed and sampler
+#   queue/        one file per shard not yet taken
+#   claimed/      shards being simulated
+#   done/         the counts of each finished shard
+#
+# A worker takes a shard by renaming its file from queue/ into
+# claimed/, which only one worker can do, and publishes the counts by
+# writing a temporary file and renaming it into done/. Each shard is
+# simulated by a Simulator spawned from the plan's seed with the key
+# 'POINT:SHARD', so a shard gives the same counts wherever and however
+# often it is run. The counts add, and merging sums them for each
+# angle pair.
+#
+#---------------------------------------------------------------------
+
+import json
+import os
+import socket
+import sys
+import time
+from argparse import ArgumentParser
+from .simulation import (π_180, samplers, Simulator, estimate_ρ,
+                         detector_dial_settings)
+
+def shard_name(point, shard):
+    return f'{point:06d}-{shard:06d}.json'
+
+def write_atomically(path, value):
+    temporary = f'{path}.{socket.gethostname()}.{os.getpid()}.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(value, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+def plan(directory, points, runLength, shard_length, seed_value=0,
+         sampler='plain'):
+    """Lay out a sharded run in the directory. points are (φ1, φ2)
+    pairs in radians, each to be simulated for runLength photon pairs
+    in shards of at most shard_length."""
+    if os.path.exists(os.path.join(directory, 'plan.json')):
+        raise FileExistsError(f'{directory} already holds a plan')
+    for subdirectory in ('queue', 'claimed', 'done'):
+        os.makedirs(os.path.join(directory, subdirectory), exist_ok=True)
+    shards = []
+    for (point, (φ1, φ2)) in enumerate(points):
+        for (shard, start) in enumerate(range(0, runLength, shard_length)):
+            shards.append({'point': point, 'shard': shard,
+                           'φ1': φ1, 'φ2': φ2,
+                           'runLength': min(shard_length,
+                                            runLength - start)})
+    for entry in shards:
+        write_atomically(os.path.join(directory, 'queue',
+                                      shard_name(entry['point'],
+                                                 entry['shard'])),
+                         entry)
+    # The plan goes last, so a directory with a plan is complete.
+    write_atomically(os.path.join(directory, 'plan.json'),
+                     {'points': [list(p) for p in points],
+                      'runLength': runLength,
+                      'shards': len(shards),
+                      'seed': seed_value, 'sampler': sampler})
+
+def read_plan(directory):
+    with open(os.path.join(directory, 'plan.json')) as file:
+        return json.load(file)
+
+def claim(directory):
+    """Take a shard from the queue, returning its path in claimed/,
+    or None if the queue is empty."""
+    queue = os.path.join(directory, 'queue')
+    for name in sorted(os.listdir(queue)):
+        claimed = os.path.join(directory, 'claimed',
+                               f'{name}.{socket.gethostname()}.{os.getpid()}')
+        try:
+            os.rename(os.path.join(queue, name), claimed)
+        except FileNotFoundError:
+            continue            # Another worker took it first.
+        # A rename keeps the time the shard was queued; requeue goes
+        # by the time it was claimed.
+        try:
+            os.utime(claimed)
+        except FileNotFoundError:
+            continue            # Requeued already.
+        return claimed
+    return None
+
+def requeue(directory, older_than):
+    """Put back in the queue any shard claimed more than older_than
+    seconds ago, its worker presumably having died. Returns how many
+    were put back."""
+    claimed = os.path.join(directory, 'claimed')
+    now = time.time()
+    n = 0
+    for name in os.listdir(claimed):
+        path = os.path.join(claimed, name)
+        try:
+            if now - os.path.getmtime(path) > older_than:
+                os.rename(path, os.path.join(directory, 'queue',
+                                             name.split('.json')[0]
+                                             + '.json'))
+                n += 1
+        except FileNotFoundError:
+            pass
+    return n
+
+def run(directory, limit=None):
+    """Simulate shards from the queue until it is empty, or limit
+    shards are done. Returns how many were done."""
+    plan_ = read_plan(directory)
+    simulator = Simulator(plan_['seed'], plan_['sampler'])
+    n = 0
+    while limit is None or n < limit:
+        claimed = claim(directory)
+        if claimed is None:
+            break
+        try:
+            with open(claimed) as file:
+                entry = json.load(file)
+        except FileNotFoundError:
+            continue            # Requeued, to be done by some worker.
+        key = f"{entry['point']}:{entry['shard']}"
+        counts = simulator.spawn(key).countData(entry['φ1'], entry['φ2'],
+                                                entry['runLength'])
+        write_atomically(os.path.join(directory, 'done',
+                                      shard_name(entry['point'],
+                                                 entry['shard'])),
+                         dict(entry, substream=key, counts=counts))
+        try:
+            os.remove(claimed)
+        except FileNotFoundError:
+            # Requeued meanwhile. It will be simulated again, to the
+            # same counts, which harms nothing.
+            pass
+        n += 1
+    return n
+
+def merge(directory):
+    """Sum the finished shards of each angle pair. Returns a list,
+    for each pair, of (φ1, φ2, counts, shards done)."""
+    plan_ = read_plan(directory)
+    totals = [[0] * 8 for point in plan_['points']]
+    shards = [0] * len(plan_['points'])
+    done = os.path.join(directory, 'done')
+    for name in os.listdir(done):
+        if not name.endswith('.json'):
+            continue
+        with open(os.path.join(done, name)) as file:
+            entry = json.load(file)
+        for i in range(8):
+            totals[entry['point']][i] += entry['counts'][i]
+        shards[entry['point']] += 1
+    return [(φ1, φ2, tuple(counts), n)
+            for ((φ1, φ2), counts, n) in zip(plan_['points'], totals,
+                                            shards)]
+
+def print_merged(directory, file=sys.stdout):
+    plan_ = read_plan(directory)
+    missing = plan_['shards']
+    for (φ1, φ2, counts, n) in merge(directory):
+        missing -= n
+        if sum(counts) == 0:
+            print(f'φ1 = {φ1 / π_180:8.3f}°  φ2 = {φ2 / π_180:8.3f}°'
+                  f'   no shards done', file=file)
+            continue
+        (detL_horiz, detR_horiz, detL_vert, detR_vert) = \
+            detector_dial_settings(counts)
+        print(f'φ1 = {φ1 / π_180:8.3f}°  φ2 = {φ2 / π_180:8.3f}°'
+              f'   ρ est. = {estimate_ρ(counts, φ1, φ2):8.5f}'
+              f'   {sum(counts):14d} pairs'
+              f'   meters {detL_horiz:.5f} {detR_horiz:.5f}'
+              f' {detL_vert:.5f} {detR_vert:.5f}', file=file)
+    if missing > 0:
+        print(f'{missing} of {plan_["shards"]} shards not yet done',
+              file=sys.stderr)
+    return missing
+
+def main():
+    parser = ArgumentParser(
+        prog='Quantum-Correlations-Shards',
+        description='Split long simulations into shards, run them on '
+        'any number of machines sharing a directory, and merge the '
+        'counts.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    plan_parser = commands.add_parser('plan', help='lay out the shards')
+    plan_parser.add_argument('directory')
+    plan_parser.add_argument('--angles', type=float, nargs=2,
+                             action='append', metavar=('PHI1', 'PHI2'),
+                             help='an angle pair in degrees; may be '
+                             'given more than once')
+    plan_parser.add_argument('--sweep', type=float, nargs=2,
+                             metavar=('DELTA', 'N'),
+                             help='N angle pairs, phi_1 going around '
+                             'the circle and phi_2 = phi_1 + DELTA')
+    plan_parser.add_argument('--run-length', type=int, required=True,
+                             metavar='N', help='photon pairs per angle pair')
+    plan_parser.add_argument('--shard-length', type=int, default=10 ** 7,
+                             metavar='N', help='photon pairs per shard')
+    plan_parser.add_argument('--seed', type=int, default=0)
+    plan_parser.add_argument('--sampler',
+                             choices=samplers + ('multinomial',),
+                             default='plain')
+
+    run_parser = commands.add_parser('run', help='simulate shards until '
+                                     'the queue is empty')
+    run_parser.add_argument('directory')
+    run_parser.add_argument('--limit', type=int, metavar='N',
+                            help='stop after N shards')
+    run_parser.add_argument('--requeue', type=float, metavar='SECONDS',
+                            help='first put back shards claimed more '
+                            'than SECONDS ago')
+
+    merge_parser = commands.add_parser('merge', help='sum the shards and '
+                                       'estimate')
+    merge_parser.add_argument('directory')
+
+    args = parser.parse_args()
+    if args.command == 'plan':
+        points = [(φ1 * π_180, φ2 * π_180) for (φ1, φ2) in args.angles or []]
+        if args.sweep is not None:
+            (Δφ, n) = (args.sweep[0] * π_180, int(args.sweep[1]))
+            points += [(i * 360.0 / n * π_180, i * 360.0 / n * π_180 + Δφ)
+                       for i in range(n)]
+        if not points:
+            parser.error('plan needs --angles or --sweep')
+        if args.run_length < 1 or args.shard_length < 1:
+            parser.error('run and shard lengths must be positive')
+        plan(args.directory, points, args.run_length, args.shard_length,
+             args.seed, args.sampler)
+    elif args.command == 'run':
+        if args.requeue is not None:
+            requeue(args.directory, args.requeue)
+        run(args.directory, args.limit)
+    else:
+        if print_merged(args.directory) > 0:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
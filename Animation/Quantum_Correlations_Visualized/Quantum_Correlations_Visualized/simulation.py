@@ -0,0 +1,848 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+#---------------------------------------------------------------------
+#
+# The simulation, apart from its display. Nothing here needs pyglet,
+# so it can be imported on machines without a display.
+#
+#---------------------------------------------------------------------
+
+from bisect import bisect_left
+from collections import namedtuple, deque
+from enum import Enum
+from functools import partial
+from random import Random, SystemRandom
+from math import pi, sin, cos, sqrt, exp, log, floor, ceil, lgamma
+from time import perf_counter
+from .ring import SimulationWorker
+from .profiling import timed
+from .backends import get_backend
+
+# The module random is itself a generator, the global one, and is the
+# default wherever a generator may be given.
+import random as global_random
+
+π     = pi
+π_2   = π / 2.0
+π_3   = π / 3.0
+π_4   = π / 4.0
+π_6   = π / 6.0
+π_8   = π / 8.0
+π_180 = π / 180.0
+two_π = 2.0 * π
+
+def cosine_sign(φ):
+    return (-1.0 if cos(φ) < 0.0 else 1.0)
+
+def sine_sign(φ):
+    return (-1.0 if sin(φ) < 0.0 else 1.0)
+
+def cc_sign(φ1, φ2):
+    return cosine_sign(φ1) * cosine_sign(φ2)
+
+def cs_sign(φ1, φ2):
+    return cosine_sign(φ1) * sine_sign(φ2)
+
+def sc_sign(φ1, φ2):
+    return sine_sign(φ1) * cosine_sign(φ2)
+
+def ss_sign(φ1, φ2):
+    return sine_sign(φ1) * sine_sign(φ2)
+
+class Photon(Enum):
+    HORIZONTAL = 1
+    VERTICAL = 2
+
+class Detector(Enum):
+    PLUS = 1
+    MINUS = 2
+
+samplers = ('plain', 'stratified', 'antithetic', 'halton', 'bitsliced')
+
+def radical_inverse(i, base):
+    x = 0.0
+    f = 1.0 / base
+    while i > 0:
+        x += (i % base) * f
+        i //= base
+        f /= base
+    return x
+
+def uniforms(sampler, runLength, rng=global_random):
+    """Generate a triple (u, r1, r2) of uniform deviates for each
+    photon pair: u < 0.5 makes photon 1 horizontal, and r1 and r2
+    decide the detectors. The samplers are
+
+      'plain'       independent draws from rng.random();
+
+      'stratified'  pairs in twos, one of each polarization, in
+                    random order, so the polarizations are split
+                    exactly 50/50;
+
+      'antithetic'  pairs in twos with the same polarization, the
+                    second taking 1 − r1 and 1 − r2;
+
+      'halton'      the Halton sequence in bases 2, 3 and 5, shifted
+                    modulo 1 by a random vector, which keeps the
+                    estimates unbiased.
+
+    The 'bitsliced' sampler works on whole chunks of pairs rather
+    than deviates; see countData_bitsliced."""
+    random = rng.random
+    if sampler == 'plain':
+        for i in range(runLength):
+            yield (random(), random(), random())
+    elif sampler == 'stratified':
+        for i in range(runLength // 2):
+            (a, b) = ((0.25, 0.75) if random() < 0.5 else (0.75, 0.25))
+            yield (a, random(), random())
+            yield (b, random(), random())
+        if runLength % 2 == 1:
+            yield (random(), random(), random())
+    elif sampler == 'antithetic':
+        for i in range(runLength // 2):
+            (u, r1, r2) = (random(), random(), random())
+            yield (u, r1, r2)
+            yield (u, 1.0 - r1, 1.0 - r2)
+        if runLength % 2 == 1:
+            yield (random(), random(), random())
+    elif sampler == 'halton':
+        (shift0, shift1, shift2) = (random(), random(), random())
+        for i in range(1, runLength + 1):
+            yield ((radical_inverse(i, 2) + shift0) % 1.0,
+                   (radical_inverse(i, 3) + shift1) % 1.0,
+                   (radical_inverse(i, 5) + shift2) % 1.0)
+    else:
+        raise ValueError(f'unknown sampler {sampler!r}')
+
+def countData_sampled(ζ1, ζ2, runLength, sampler, rng=global_random):
+    """The counts of countData, with the random deviates drawn by one
+    of the samplers of uniforms."""
+
+    # For a horizontal photon 1, photon 2 is vertical, and the other
+    # way round.
+    h1 = cos(ζ1) ** 2
+    h2 = sin(ζ2) ** 2
+    v1 = sin(ζ1) ** 2
+    v2 = cos(ζ2) ** 2
+
+    counts = [0] * 8
+    for (u, r1, r2) in uniforms(sampler, runLength, rng):
+        if u < 0.5:
+            counts[(0 if r1 < h1 else 2) + (0 if r2 < h2 else 1)] += 1
+        else:
+            counts[4 + (0 if r1 < v1 else 2) + (0 if r2 < v2 else 1)] += 1
+    return tuple(counts)
+
+# The bitsliced sampler gives each photon pair one bit for its
+# polarization and a 31-bit deviate for each detector, 63 random bits
+# in all, but stores them transposed: bit j of each of a few big
+# integers belongs to pair j, so that one integer operation works on a
+# whole chunk of pairs at once, and the counts are popcounts. A
+# detector is + if its deviate is below ceil(p·2³¹), p being the
+# probability of +. The resolution is therefore 2⁻³¹, and each
+# probability is too high by less than 2⁻³¹ (about 5·10⁻¹⁰), a bias
+# far below the statistical error of any feasible run.
+bitslice_width = 31
+bitslice_chunk_size = 1 << 16
+
+def bitslice_below(n, p, getrandbits):
+    """Return an n-bit integer whose bit j is set if the jth of n
+    random bitslice_width-bit deviates is below the threshold for p.
+    The deviates are compared a bit plane at a time, from the most
+    significant, and planes are drawn only while some comparison is
+    still undecided."""
+    threshold = ceil(p * (1 << bitslice_width))
+    undecided = (1 << n) - 1
+    if threshold >> bitslice_width:
+        return undecided        # Every deviate is below.
+    below = 0
+    for k in reversed(range(bitslice_width)):
+        if undecided == 0:
+            break
+        plane = getrandbits(n)
+        if (threshold >> k) & 1:
+            below |= undecided & ~plane
+            undecided &= plane
+        else:
+            undecided &= ~plane
+    return below
+
+def countData_bitsliced(ζ1, ζ2, runLength, rng=global_random):
+    """The counts of countData, simulated a chunk of pairs at a
+    time with integer operations."""
+    getrandbits = rng.getrandbits
+    (h1, h2) = (cos(ζ1) ** 2, sin(ζ2) ** 2)
+    (v1, v2) = (sin(ζ1) ** 2, cos(ζ2) ** 2)
+    counts = [0] * 8
+    for start in range(0, runLength, bitslice_chunk_size):
+        n = min(bitslice_chunk_size, runLength - start)
+        all_pairs = (1 << n) - 1
+        vertical = getrandbits(n)
+        horizontal = all_pairs & ~vertical
+        for (i, pairs, p1, p2) in ((0, horizontal, h1, h2),
+                                   (4, vertical, v1, v2)):
+            plus1 = bitslice_below(n, p1, getrandbits) & pairs
+            minus1 = pairs & ~plus1
+            plus2 = bitslice_below(n, p2, getrandbits)
+            counts[i] += (plus1 & plus2).bit_count()
+            counts[i + 1] += (plus1 & ~plus2).bit_count()
+            counts[i + 2] += (minus1 & plus2).bit_count()
+            counts[i + 3] += (minus1 & ~plus2).bit_count()
+    return tuple(counts)
+
+def countData(ζ1, ζ2, runLength, sampler='plain', rng=global_random):
+
+    if sampler == 'bitsliced':
+        return countData_bitsliced(ζ1, ζ2, runLength, rng)
+    if sampler != 'plain':
+        return countData_sampled(ζ1, ζ2, runLength, sampler, rng)
+
+    random = rng.random
+
+    n_hpp = 0
+    n_hpm = 0
+    n_hmp = 0
+    n_hmm = 0
+    n_vpp = 0
+    n_vpm = 0
+    n_vmp = 0
+    n_vmm = 0
+
+    for i in range(runLength):
+
+        σ1 = (Photon.HORIZONTAL if random() < 0.5
+              else Photon.VERTICAL)
+        σ2 = (Photon.VERTICAL if σ1 == Photon.HORIZONTAL
+              else Photon.HORIZONTAL)
+
+        r1 = random()
+        x1 = (cos(ζ1) if σ1 == Photon.HORIZONTAL else sin(ζ1))
+        τ1 = (Detector.PLUS if r1 < x1 * x1 else Detector.MINUS)
+
+        r2 = random()
+        x2 = (cos(ζ2) if σ2 == Photon.HORIZONTAL else sin(ζ2))
+        τ2 = (Detector.PLUS if r2 < x2 * x2 else Detector.MINUS)
+
+        if σ1 == Photon.HORIZONTAL:
+            if τ1 == Detector.PLUS:
+                if τ2 == Detector.PLUS:
+                    n_hpp += 1
+                else:
+                    n_hpm += 1
+            else:
+                if τ2 == Detector.PLUS:
+                    n_hmp += 1
+                else:
+                    n_hmm += 1
+        else:
+            if τ1 == Detector.PLUS:
+                if τ2 == Detector.PLUS:
+                    n_vpp += 1
+                else:
+                    n_vpm += 1
+            else:
+                if τ2 == Detector.PLUS:
+                    n_vmp += 1
+                else:
+                    n_vmm += 1
+
+    return (n_hpp, n_hpm, n_hmp, n_hmm,
+            n_vpp, n_vpm, n_vmp, n_vmm)
+
+def countData_panels(ζ1, ζ2s, runLength, rng=global_random):
+    """The counts of countData for several angles of channel 2 at
+    once, from one run of photon pairs: the polarizations and the
+    detections at channel 1 are drawn once, and so is each deviate
+    for channel 2, compared against each angle's probability in turn
+    (common random numbers). Returns a list of counts, one for each
+    of ζ2s; for a single angle they are those of countData."""
+
+    random = rng.random
+    x1 = cos(ζ1)
+    h1 = x1 * x1
+    x1 = sin(ζ1)
+    v1 = x1 * x1
+
+    # The channel 2 deviates, by the polarization of photon 1 and the
+    # detection at channel 1.
+    (hp, hm, vp, vm) = ([], [], [], [])
+    for i in range(runLength):
+        if random() < 0.5:
+            (hp if random() < h1 else hm).append(random())
+        else:
+            (vp if random() < v1 else vm).append(random())
+    for deviates in (hp, hm, vp, vm):
+        deviates.sort()
+
+    # For a horizontal photon 1, photon 2 is vertical, and the other
+    # way round. A detection is + if its deviate is below p.
+    panels = []
+    for ζ2 in ζ2s:
+        x2 = sin(ζ2)
+        h2 = x2 * x2
+        x2 = cos(ζ2)
+        v2 = x2 * x2
+        counts = []
+        for (deviates, p) in ((hp, h2), (hm, h2), (vp, v2), (vm, v2)):
+            n_plus = bisect_left(deviates, p)
+            counts += [n_plus, len(deviates) - n_plus]
+        panels.append(tuple(counts))
+    return panels
+
+def binomial(n, p, rng=global_random):
+    """Draw from the binomial distribution, using rng.random(), in
+    time independent of n. This is the BTRS method of Hörmann, with
+    Devroye's geometric method for small n·p."""
+    random = rng.random
+    if p <= 0.0:
+        return 0
+    if p >= 1.0:
+        return n
+    if p > 0.5:
+        return n - binomial(n, 1.0 - p, rng)
+    if n * p < 10.0:
+        k = 0
+        y = 0
+        c = log(1.0 - p)
+        if c == 0.0:
+            return 0            # p is too small to matter.
+        while True:
+            y += floor(log(1.0 - random()) / c) + 1
+            if y > n:
+                return k
+            k += 1
+    spq = sqrt(n * p * (1.0 - p))
+    b = 1.15 + 2.53 * spq
+    a = -0.0873 + 0.0248 * b + 0.01 * p
+    c = n * p + 0.5
+    vr = 0.92 - 4.2 / b
+    alpha = (2.83 + 5.1 / b) * spq
+    lpq = log(p / (1.0 - p))
+    m = floor((n + 1) * p)
+    h = lgamma(m + 1) + lgamma(n - m + 1)
+    while True:
+        u = random() - 0.5
+        us = 0.5 - abs(u)
+        k = floor((2.0 * a / us + b) * u + c)
+        if k < 0 or k > n:
+            continue
+        v = random()
+        if us >= 0.07 and v <= vr:
+            return k
+        v *= alpha / (a / (us * us) + b)
+        if log(v) <= h - lgamma(k + 1) - lgamma(n - k + 1) + (k - m) * lpq:
+            return k
+
+def countData_multinomial(ζ1, ζ2, runLength, rng=global_random):
+    """Draw the counts that countData would return directly from
+    their multinomial distribution, in time independent of runLength.
+    The photon pair is drawn first, then the detectors, just as for a
+    single pair."""
+
+    n_h = binomial(runLength, 0.5, rng)
+    n_v = runLength - n_h
+
+    # For a horizontal photon 1, photon 2 is vertical.
+    n_hp = binomial(n_h, cos(ζ1) ** 2, rng)
+    n_hpp = binomial(n_hp, sin(ζ2) ** 2, rng)
+    n_hmp = binomial(n_h - n_hp, sin(ζ2) ** 2, rng)
+
+    # For a vertical photon 1, photon 2 is horizontal.
+    n_vp = binomial(n_v, sin(ζ1) ** 2, rng)
+    n_vpp = binomial(n_vp, cos(ζ2) ** 2, rng)
+    n_vmp = binomial(n_v - n_vp, cos(ζ2) ** 2, rng)
+
+    return (n_hpp, n_hp - n_hpp, n_hmp, n_h - n_hp - n_hmp,
+            n_vpp, n_vp - n_vpp, n_vmp, n_v - n_vp - n_vmp)
+
+class Simulator:
+    """A simulation with a random number generator of its own, so
+    that it neither disturbs nor is disturbed by the global generator
+    or other Simulators, and the same seed gives the same counts even
+    with several Simulators running in threads (one thread each). The
+    sampler is one of samplers, or 'multinomial'. The backend, named as
+    for backends.get_backend, simulates for the 'plain' sampler; the
+    others are pure Python. The same seed gives the same counts only
+    with the same backend."""
+
+    def __init__(self, seed_value=None, sampler='plain', backend='python'):
+        if sampler != 'multinomial' and sampler not in samplers:
+            raise ValueError(f'unknown sampler {sampler!r}')
+        # Only the name is kept, so Simulators can be pickled.
+        self.backend = get_backend(backend).name
+        if seed_value is None:
+            seed_value = SystemRandom().getrandbits(64)
+        self.seed_value = seed_value
+        self.sampler = sampler
+        self.rng = Random(seed_value)
+
+    def spawn(self, key):
+        """Split off a new Simulator, seeded from this one's seed and
+        the key (hashed with SHA-512), so its stream is independent of
+        this one's and of any other key's."""
+        return Simulator(f'{self.seed_value}:{key}', self.sampler,
+                         self.backend)
+
+    def getstate(self):
+        return self.rng.getstate()
+
+    def setstate(self, state):
+        self.rng.setstate(state)
+
+    def countData(self, ζ1, ζ2, runLength):
+        if self.sampler == 'multinomial':
+            return countData_multinomial(ζ1, ζ2, runLength, self.rng)
+        if self.sampler == 'plain':
+            return get_backend(self.backend).countData(ζ1, ζ2, runLength,
+                                                       self.rng)
+        return countData(ζ1, ζ2, runLength, self.sampler, self.rng)
+
+    def countData_panels(self, ζ1, ζ2s, runLength):
+        return countData_panels(ζ1, ζ2s, runLength, self.rng)
+
+    def estimate_ρ(self, φ1, φ2, runLength):
+        return estimate_ρ(self.countData(φ1, φ2, runLength), φ1, φ2)
+
+    def detector_dial_settings(self, φ1, φ2, runLength):
+        return detector_dial_settings(self.countData(φ1, φ2, runLength))
+
+def detector_dial_settings(counts):
+
+    (n_hpp, n_hpm, n_hmp, n_hmm,
+     n_vpp, n_vpm, n_vmp, n_vmm) = counts
+
+    n_hp1 = n_hpp + n_hpm
+    n_hm1 = n_hmp + n_hmm
+
+    n_hp2 = n_hpp + n_hmp
+    n_hm2 = n_hpm + n_hmm
+
+    n_vp1 = n_vpp + n_vpm
+    n_vm1 = n_vmp + n_vmm
+
+    n_vp2 = n_vpp + n_vmp
+    n_vm2 = n_vpm + n_vmm
+
+    return (n_hp1 / (n_hp1 + n_hm1),
+            n_hp2 / (n_hp2 + n_hm2),
+            n_vp1 / (n_vp1 + n_vm1),
+            n_vp2 / (n_vp2 + n_vm2))
+
+def estimate_ρ(counts, φ1, φ2):
+
+    (n_hpp, n_hpm, n_hmp, n_hmm,
+     n_vpp, n_vpm, n_vmp, n_vmm) = counts
+
+    n = (n_hpp + n_hpm + n_hmp + n_hmm +
+         n_vpp + n_vpm + n_vmp + n_vmm)
+
+    # Compute frequencies.
+    hpp = n_hpp / n
+    hpm = n_hpm / n
+    hmp = n_hmp / n
+    hmm = n_hmm / n
+    vpp = n_vpp / n
+    vpm = n_vpm / n
+    vmp = n_vmp / n
+    vmm = n_vmm / n
+
+    # Estimate cos²(φ₁)cos²(φ₂), etc., using measured frequencies in
+    # lieu of the probabilities.
+    c2c2 = hpm + vmp
+    c2s2 = hpp + vmm
+    s2c2 = hmm + vpp
+    s2s2 = hmp + vpm
+
+    # Take square roots. Correct the signs for quadrants.
+    cc = cc_sign(φ1, φ2) * sqrt(c2c2)
+    cs = cs_sign(φ1, φ2) * sqrt(c2s2)
+    sc = sc_sign(φ1, φ2) * sqrt(s2c2)
+    ss = ss_sign(φ1, φ2) * sqrt(s2s2)
+
+    # Use angle-difference identities to get cos(φ1-φ2) and
+    # sin(φ1-φ2).
+    c12 = cc + ss
+    s12 = sc - cs
+
+    # Return -(cos²(φ1-φ2)-sin²(φ1-φ2))=-cos(2(φ1-φ2)).
+    return -((c12 * c12) - (s12 * s12))
+
+def estimate_ρ_batch(counts, φ1, φ2):
+    """Do estimate_ρ and detector_dial_settings for K count vectors
+    at once, with NumPy. counts is K×8, and φ1 and φ2 have K entries
+    each. Returns ρ, of shape (K,), and the dial settings, of shape
+    (K, 4), the same numbers the scalar functions give. Where a meter
+    has no photons its setting is NaN, instead of an exception."""
+    import numpy
+
+    counts = numpy.asarray(counts, dtype=float).reshape(-1, 8)
+    φ1 = numpy.asarray(φ1, dtype=float).reshape(-1)
+    φ2 = numpy.asarray(φ2, dtype=float).reshape(-1)
+
+    (n_hpp, n_hpm, n_hmp, n_hmm,
+     n_vpp, n_vpm, n_vmp, n_vmm) = counts.T
+
+    n = (n_hpp + n_hpm + n_hmp + n_hmm +
+         n_vpp + n_vpm + n_vmp + n_vmm)
+
+    c2c2 = n_hpm / n + n_vmp / n
+    c2s2 = n_hpp / n + n_vmm / n
+    s2c2 = n_hmm / n + n_vpp / n
+    s2s2 = n_hmp / n + n_vpm / n
+
+    # The quadrant signs of cc_sign and the rest.
+    cosine1 = numpy.where(numpy.cos(φ1) < 0.0, -1.0, 1.0)
+    sine1 = numpy.where(numpy.sin(φ1) < 0.0, -1.0, 1.0)
+    cosine2 = numpy.where(numpy.cos(φ2) < 0.0, -1.0, 1.0)
+    sine2 = numpy.where(numpy.sin(φ2) < 0.0, -1.0, 1.0)
+
+    cc = (cosine1 * cosine2) * numpy.sqrt(c2c2)
+    cs = (cosine1 * sine2) * numpy.sqrt(c2s2)
+    sc = (sine1 * cosine2) * numpy.sqrt(s2c2)
+    ss = (sine1 * sine2) * numpy.sqrt(s2s2)
+
+    c12 = cc + ss
+    s12 = sc - cs
+    ρ = -((c12 * c12) - (s12 * s12))
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        n_hp1 = n_hpp + n_hpm
+        n_hp2 = n_hpp + n_hmp
+        n_vp1 = n_vpp + n_vpm
+        n_vp2 = n_vpp + n_vmp
+        settings = numpy.stack([n_hp1 / (n_hp1 + (n_hmp + n_hmm)),
+                                n_hp2 / (n_hp2 + (n_hpm + n_hmm)),
+                                n_vp1 / (n_vp1 + (n_vmp + n_vmm)),
+                                n_vp2 / (n_vp2 + (n_vpm + n_vmm))],
+                               axis=1)
+    return (ρ, settings)
+
+def difference_terms(counts, φ1, φ2):
+    """Estimate cos(φ1-φ2) and sin(φ1-φ2) as estimate_ρ does. These
+    do not depend on the angles except through their difference."""
+
+    (n_hpp, n_hpm, n_hmp, n_hmm,
+     n_vpp, n_vpm, n_vmp, n_vmm) = counts
+
+    n = (n_hpp + n_hpm + n_hmp + n_hmm +
+         n_vpp + n_vpm + n_vmp + n_vmm)
+
+    c2c2 = (n_hpm + n_vmp) / n
+    c2s2 = (n_hpp + n_vmm) / n
+    s2c2 = (n_hmm + n_vpp) / n
+    s2s2 = (n_hmp + n_vpm) / n
+
+    cc = cc_sign(φ1, φ2) * sqrt(c2c2)
+    cs = cs_sign(φ1, φ2) * sqrt(c2s2)
+    sc = sc_sign(φ1, φ2) * sqrt(s2c2)
+    ss = ss_sign(φ1, φ2) * sqrt(s2s2)
+
+    return (cc + ss, sc - cs)
+
+class SlidingWindow:
+    """Counts from the most recent frames, each frame simulating only
+    a small batch of photon pairs.
+
+    The channels turn from frame to frame, so the counts of different
+    frames cannot simply be added up to estimate ρ: the result would
+    be biased wherever a quadrant sign changes within the window.
+    Instead each frame contributes its estimates of cos(φ1-φ2) and
+    sin(φ1-φ2), which do not change as the channels turn, and ρ is
+    computed from their averages over the whole window. The meters do
+    follow the angles, so they are read from the counts of only the
+    newest meter_frames frames, and lag the dials by about half that
+    many frames.
+
+    Sums are kept as frames enter and leave the window, so each frame
+    costs the same however long the window."""
+
+    def __init__(self, frames=320, batch=1000, meter_frames=4):
+        assert 1 <= meter_frames < frames
+        self.batch = batch
+        self.meter_frames = meter_frames
+        self.frames = deque(maxlen=frames)
+        self.n = 0
+        self.sum_c12 = 0.0
+        self.sum_s12 = 0.0
+        self.meter_counts = [0] * 8
+
+    def add(self, counts, φ1, φ2):
+        """Add one frame's counts, simulated at the given angles."""
+        n = sum(counts)
+        (c12, s12) = difference_terms(counts, φ1, φ2)
+        if len(self.frames) == self.frames.maxlen:
+            (old_counts, old_n, old_c12, old_s12) = self.frames[0]
+            self.n -= old_n
+            self.sum_c12 -= old_n * old_c12
+            self.sum_s12 -= old_n * old_s12
+        self.frames.append((counts, n, c12, s12))
+        self.n += n
+        self.sum_c12 += n * c12
+        self.sum_s12 += n * s12
+        if len(self.frames) > self.meter_frames:
+            leaving = self.frames[-1 - self.meter_frames][0]
+            for i in range(8):
+                self.meter_counts[i] -= leaving[i]
+        for i in range(8):
+            self.meter_counts[i] += counts[i]
+
+    def detector_dial_settings(self):
+        return detector_dial_settings(self.meter_counts)
+
+    def estimate_ρ(self):
+        c12 = self.sum_c12 / self.n
+        s12 = self.sum_s12 / self.n
+        return -((c12 * c12) - (s12 * s12))
+
+class Governor:
+    """Chooses how many photon pairs to simulate each frame, so that
+    the simulation takes about budget seconds whatever the speed of
+    the computer. The cost per pair is measured every frame and
+    smoothed exponentially, and the run length moves only part of the
+    way toward its target each frame, so noise in the timings does not
+    make it oscillate."""
+
+    def __init__(self, budget=0.03, runLength=10000, smoothing=0.2,
+                 minimum=100, maximum=10 ** 7):
+        assert budget > 0 and 0 < smoothing <= 1
+        self.budget = budget
+        self.runLength = runLength
+        self.smoothing = smoothing
+        self.minimum = minimum
+        self.maximum = maximum
+        self.cost = None
+
+    def observe(self, seconds, runLength):
+        """Take note that simulating runLength pairs took the given
+        time, and choose the next run length."""
+        if seconds <= 0.0 or runLength <= 0:
+            return
+        cost = seconds / runLength
+        if self.cost is None:
+            self.cost = cost
+        else:
+            self.cost += self.smoothing * (cost - self.cost)
+        target = self.budget / self.cost
+        runLength = self.runLength + self.smoothing * (target - self.runLength)
+        self.runLength = round(min(max(runLength, self.minimum),
+                                   self.maximum))
+
+    def events_per_second(self):
+        return (0.0 if self.cost is None else 1.0 / self.cost)
+
+def lowpass(ρ_filtered, ρ_est, Δt):
+    """Single-pole IIR lowpass filter, cutoff freq. 0.01 Hz. The
+    coefficient is scaled to the frame time, so the filter responds
+    the same at any frame rate as at 20 frames per second."""
+    return ρ_filtered + \
+        (1.0 - exp (-0.01 * two_π * Δt / 0.05)) * (ρ_est - ρ_filtered)
+
+def channel_angles(t, k, Δφ):
+    """Compute the angles of the two channels at time t."""
+    φ1 = k * t
+    φ2 = φ1 + Δφ
+    return (φ1 % two_π, φ2 % two_π)
+
+# What the display shows at one instant: the time, the angles of the
+# two channels, the four meter readings, and the correlation
+# coefficient, both as estimated from this frame's counts and after
+# lowpass filtering.
+Reading = namedtuple('Reading',
+                     ['t', 'φ1', 'φ2',
+                      'detL_horiz', 'detR_horiz', 'detL_vert', 'detR_vert',
+                      'ρ_est', 'ρ_filtered'])
+
+# A Reading of one of several experiments shown side by side.
+PanelReading = namedtuple('PanelReading', ['panel', *Reading._fields])
+
+class BellTest:
+    """The state of the animated experiment."""
+
+    # The fields of the readings it gives.
+    fields = Reading._fields
+
+    def __init__(self, Δφ, countData=countData, runLength=10000,
+                 worker=False, sliding_window=None, profiler=None,
+                 governor=None):
+        """With a SlidingWindow, each frame simulates only the
+        window's batch of photon pairs, and the meters and ρ are read
+        from the window instead of the IIR filter. A Profiler, if
+        given, is charged with the time of each stage of a step. A
+        Governor, if given, sets the run length (or the window's
+        batch) each frame; it cannot be used with a worker."""
+        assert governor is None or not worker
+        self.Δφ = Δφ
+        self.profiler = profiler
+        self.governor = governor
+        self.countData = countData
+        self.sliding_window = sliding_window
+        if sliding_window is not None:
+            runLength = sliding_window.batch
+        if governor is not None:
+            governor.runLength = runLength
+        self.runLength = runLength
+        self.t = 0.0
+        self.k = 1.0
+        self.ρ_filtered = 0.0
+        self.t_counts = None
+        self.worker = (SimulationWorker(partial(channel_angles, k=self.k,
+                                                Δφ=self.Δφ),
+                                        countData, runLength)
+                       if worker else None)
+
+    def angles(self):
+        """Compute the current angles of the two channels."""
+        return channel_angles(self.t, self.k, self.Δφ)
+
+    def step(self, Δt):
+        """Advance the time by Δt and simulate. Returns a Reading, or
+        None if a worker has not yet published any counts."""
+        if self.profiler is None:
+            return self.advance(Δt)
+        start = perf_counter()
+        reading = self.advance(Δt)
+        self.profiler.frame('step', perf_counter() - start)
+        return reading
+
+    def advance(self, Δt):
+        self.t += Δt
+        (φ1, φ2) = self.angles()
+
+        if self.governor is not None:
+            self.runLength = self.governor.runLength
+            start = perf_counter()
+            with timed(self.profiler, 'simulate', self.runLength):
+                counts = self.countData(φ1, φ2, self.runLength)
+            self.governor.observe(perf_counter() - start, self.runLength)
+        elif self.worker is None:
+            with timed(self.profiler, 'simulate', self.runLength):
+                counts = self.countData(φ1, φ2, self.runLength)
+        else:
+            # Take the latest counts the worker has published, and the
+            # angles they were simulated for.
+            with timed(self.profiler, 'read worker'):
+                self.worker.ring.request(self.t)
+                latest = self.worker.ring.latest()
+            if latest is None:
+                return None
+            (t_counts, φ1, φ2, counts) = latest
+            if self.sliding_window is not None and t_counts == self.t_counts:
+                # Already in the window.
+                return self.windowed_reading(φ1, φ2, counts)
+            self.t_counts = t_counts
+
+        if self.sliding_window is not None:
+            with timed(self.profiler, 'estimate'):
+                self.sliding_window.add(counts, φ1, φ2)
+                return self.windowed_reading(φ1, φ2, counts)
+
+        with timed(self.profiler, 'estimate'):
+            (detL_horiz, detR_horiz, detL_vert, detR_vert) = \
+                detector_dial_settings(counts)
+            ρ_est = estimate_ρ(counts, φ1, φ2)
+
+        self.ρ_filtered = lowpass(self.ρ_filtered, ρ_est, Δt)
+
+        return Reading(self.t, φ1, φ2, detL_horiz, detR_horiz,
+                       detL_vert, detR_vert, ρ_est, self.ρ_filtered)
+
+    def windowed_reading(self, φ1, φ2, counts):
+        self.ρ_filtered = self.sliding_window.estimate_ρ()
+        return Reading(self.t, φ1, φ2,
+                       *self.sliding_window.detector_dial_settings(),
+                       estimate_ρ(counts, φ1, φ2), self.ρ_filtered)
+
+    def close(self):
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker = None
+
+class BellTests:
+    """Several animated experiments side by side, one for each Δφ,
+    their channels 1 turning in unison. Each frame simulates one run
+    of photon pairs for all of them, with countData_panels, so their
+    readings differ only by Δφ and not by chance, and N experiments
+    cost much less than N times one."""
+
+    # The fields of the readings it gives.
+    fields = PanelReading._fields
+
+    def __init__(self, Δφs, countData_panels=countData_panels,
+                 runLength=10000, profiler=None, governor=None):
+        """A Profiler, if given, is charged with the time of each stage
+        of a step. A Governor, if given, sets the run length each
+        frame."""
+        self.Δφs = tuple(Δφs)
+        self.profiler = profiler
+        self.governor = governor
+        self.countData_panels = countData_panels
+        if governor is not None:
+            governor.runLength = runLength
+        self.runLength = runLength
+        self.t = 0.0
+        self.k = 1.0
+        self.ρ_filtered = [0.0] * len(self.Δφs)
+
+    def angles(self):
+        """Compute the current angle of the channels 1, and a list of
+        the angles of the channels 2."""
+        φ1 = self.k * self.t
+        return (φ1 % two_π, [(φ1 + Δφ) % two_π for Δφ in self.Δφs])
+
+    def step(self, Δt):
+        """Advance the time by Δt and simulate. Returns a list of
+        PanelReadings, one for each Δφ."""
+        if self.profiler is None:
+            return self.advance(Δt)
+        start = perf_counter()
+        readings = self.advance(Δt)
+        self.profiler.frame('step', perf_counter() - start)
+        return readings
+
+    def advance(self, Δt):
+        self.t += Δt
+        (φ1, φ2s) = self.angles()
+
+        if self.governor is not None:
+            self.runLength = self.governor.runLength
+        start = perf_counter()
+        with timed(self.profiler, 'simulate', self.runLength):
+            panels = self.countData_panels(φ1, φ2s, self.runLength)
+        if self.governor is not None:
+            self.governor.observe(perf_counter() - start, self.runLength)
+
+        readings = []
+        with timed(self.profiler, 'estimate'):
+            for (i, (φ2, counts)) in enumerate(zip(φ2s, panels)):
+                ρ_est = estimate_ρ(counts, φ1, φ2)
+                self.ρ_filtered[i] = lowpass(self.ρ_filtered[i], ρ_est, Δt)
+                readings.append(
+                    PanelReading(i, self.t, φ1, φ2,
+                                 *detector_dial_settings(counts),
+                                 ρ_est, self.ρ_filtered[i]))
+        return readings
+
+    def close(self):
+        pass
@@ -0,0 +1,158 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+#---------------------------------------------------------------------
+#
+# The correlation coefficient and the four meter readings over a grid
+# of (φ1, φ2).
+#
+# The grid is worked through in square tiles, each written to the
+# output file as soon as it is done, so memory use depends on the tile
+# size and not on the grid. The output is a NumPy .npy file (written
+# without needing NumPy) holding an array of shape (n1, n2, 5), whose
+# last axis is
+#
+#    (ρ, detL_horiz, detR_horiz, detL_vert, detR_vert)
+#
+# for φ1 = φ1_start + i·(φ1_stop − φ1_start)/n1 and likewise φ2.
+#
+#---------------------------------------------------------------------
+
+import struct
+import sys
+from argparse import ArgumentParser
+from array import array
+from .backends import backend_names, environment_variable, get_backend
+from .simulation import (π_180, two_π, countData_multinomial,
+                         detector_dial_settings, estimate_ρ,
+                         estimate_ρ_batch, samplers, Simulator)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+FIELDS = 5
+
+def grid(start, stop, n):
+    return [start + i * (stop - start) / n for i in range(n)]
+
+def write_npy_header(file, shape):
+    header = ("{'descr': '<f8', 'fortran_order': False, 'shape': "
+              + repr(tuple(shape)) + ", }")
+    # Pad so the data start on a 64-byte boundary.
+    length = len(header) + 1
+    header += ' ' * (-(10 + length) % 64) + '\n'
+    file.write(b'\x93NUMPY\x01\x00')
+    file.write(struct.pack('<H', len(header)))
+    file.write(header.encode('latin1'))
+
+def tile_values(φ1s, φ2s, runLength, countData):
+    """Return the values for a tile, row by row, as arrays of
+    doubles. With NumPy the estimates for the whole tile are made in
+    one call."""
+    if numpy is not None:
+        cells = [(φ1 % two_π, φ2 % two_π) for φ1 in φ1s for φ2 in φ2s]
+        counts = [countData(φ1, φ2, runLength) for (φ1, φ2) in cells]
+        (φ1, φ2) = zip(*cells)
+        (ρ, settings) = estimate_ρ_batch(counts, φ1, φ2)
+        values = numpy.concatenate([ρ[:, None], settings], axis=1)
+        values = values.reshape(len(φ1s), FIELDS * len(φ2s))
+        return [array('d', row.tobytes()) for row in values]
+    rows = []
+    for φ1 in φ1s:
+        row = array('d')
+        for φ2 in φ2s:
+            counts = countData(φ1 % two_π, φ2 % two_π, runLength)
+            row.append(estimate_ρ(counts, φ1 % two_π, φ2 % two_π))
+            row.extend(detector_dial_settings(counts))
+        rows.append(row)
+    return rows
+
+def correlation_surface(path, φ1s, φ2s, runLength,
+                        countData=countData_multinomial, tile=64):
+    """Compute the surface over the grid φ1s × φ2s and write it to
+    path as a .npy file."""
+    (n1, n2) = (len(φ1s), len(φ2s))
+    with open(path, 'wb') as file:
+        write_npy_header(file, (n1, n2, FIELDS))
+        data_start = file.tell()
+        file.truncate(data_start + 8 * n1 * n2 * FIELDS)
+        for i0 in range(0, n1, tile):
+            for j0 in range(0, n2, tile):
+                rows = tile_values(φ1s[i0 : i0 + tile], φ2s[j0 : j0 + tile],
+                                   runLength, countData)
+                for (k, row) in enumerate(rows):
+                    if sys.byteorder == 'big':
+                        row.byteswap()
+                    file.seek(data_start +
+                              8 * FIELDS * ((i0 + k) * n2 + j0))
+                    row.tofile(file)
+
+def main():
+    parser = ArgumentParser(
+        prog='Quantum-Correlations-Surface',
+        description='Write the correlation coefficient and detector '
+        'predominances over a grid of angles to a .npy file, with shape '
+        '(N1, N2, 5) and fields (rho, detL_horiz, detR_horiz, detL_vert, '
+        'detR_vert).')
+    parser.add_argument('output', help='the .npy file to write')
+    parser.add_argument('--size', type=int, nargs='+', default=[720],
+                        metavar='N',
+                        help='grid points for phi_1, and for phi_2 if '
+                        'different (default 720)')
+    parser.add_argument('--phi1', type=float, nargs=2, default=[0, 360],
+                        metavar=('START', 'STOP'),
+                        help='range of phi_1 in degrees, STOP excluded '
+                        '(default 0 360)')
+    parser.add_argument('--phi2', type=float, nargs=2, default=[0, 360],
+                        metavar=('START', 'STOP'),
+                        help='range of phi_2 in degrees (default 0 360)')
+    parser.add_argument('--run-length', type=int, default=10000,
+                        metavar='N', help='photon pairs per grid point')
+    parser.add_argument('--sampler',
+                        choices=('multinomial', 'events') + samplers[1:],
+                        default='multinomial',
+                        help='how to simulate each grid point (default '
+                        'multinomial)')
+    parser.add_argument('--backend', choices=backend_names,
+                        help='the backend for the events sampler '
+                        f'(default from {environment_variable}, or '
+                        'python)')
+    parser.add_argument('--tile', type=int, default=64,
+                        help='tile side, in grid points (default 64)')
+    args = parser.parse_args()
+    if len(args.size) > 2 or min(args.size) < 1:
+        parser.error('--size takes one or two positive numbers')
+    (n1, n2) = (args.size * 2)[:2]
+
+    sampler = Simulator(0, ('plain' if args.sampler == 'events'
+                            else args.sampler),
+                        get_backend(args.backend).name).countData
+    correlation_surface(args.output,
+                        grid(args.phi1[0] * π_180, args.phi1[1] * π_180, n1),
+                        grid(args.phi2[0] * π_180, args.phi2[1] * π_180, n2),
+                        args.run_length, sampler, max(1, args.tile))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+import pyglet
+from math import sin, cos, ceil
+from time import perf_counter
+from pyglet.shapes import *
+from pyglet.text import Label
+from .simulation import countData, countData_panels, BellTest, BellTests
+
+xcenter = 350
+ycenter = 250
+
+xpbs_L = 220
+ypbs_L = ycenter
+
+xpbs_R = 480
+ypbs_R = ycenter
+
+meter_height = 300
+ymeter = 100
+
+xmeter_L_horiz = 50
+xmeter_L_axis = 70
+xmeter_L_vert = 80
+
+xmeter_R_horiz = 620
+xmeter_R_axis = 640
+xmeter_R_vert = 650
+
+font_name = "serif"
+font_size = 10
+font_color = (0, 0, 0, 255)
+
+rho_text = 'correlation coefficient [ should be approx. −cos(2×(phi_2 − phi_1)) ] = '
+xrho = xcenter - 160
+yrho = ycenter - 170
+
+# The part of the drawing of one experiment that a Panel occupies,
+# when several are shown side by side, and the widest a window of
+# them is made.
+panel_left = -30
+panel_right = 760
+panel_bottom = 50
+panel_top = 450
+panels_width = 1400
+
+border_color=(83, 86, 90)
+dial_color=(135, 24, 157)
+light_color=(246, 141, 46)
+join12_color=(244, 205, 212)
+join34_color=(229, 225, 230)
+
+class Panel:
+    """The drawing of one experiment: the source, the channels, the
+    meters and the correlation coefficient. The coordinates are those
+    of the single-experiment window, scaled by scale and moved by
+    (x, y)."""
+
+    def __init__(self, batch, Δφ_string, φ1, φ2, x=0, y=0, scale=1.0):
+        self.x = x
+        self.y = y
+        self.scale = scale
+        (X, Y, S) = (self.X, self.Y, self.S)
+        size = font_size * scale
+
+        self.source1 = \
+            Star(x=X(xcenter), y=Y(ycenter), num_spikes=80,
+                 color=light_color, outer_radius=S(20),
+                 inner_radius=S(2), batch=batch)
+        self.source2 = \
+            Rectangle(x=X(xcenter-10), y=Y(ycenter-2), width=S(20),
+                      height=S(4), color=light_color, batch=batch)
+        self.source3 = \
+            Rectangle(x=X(xcenter-2), y=Y(ycenter-10), width=S(4),
+                      height=S(20), color=light_color, batch=batch)
+        self.source_label = \
+            Label('h/v polarized photons', font_name=font_name,
+                  font_size=size, x=X(xcenter), y=Y(ycenter+30),
+                  anchor_x='center', anchor_y='center',
+                  color=font_color, batch=batch)
+
+        self.channel_L_border = \
+            Arc(x=X(xpbs_L), y=Y(ypbs_L), radius=S(50),
+                color=border_color, batch=batch)
+        self.channel_L_dial = \
+            Line(x=X(xpbs_L), y=Y(ypbs_L), x2=X(xpbs_L+50*cos(φ1)),
+                 y2=Y(ypbs_L+50*sin(φ1)), color=dial_color,
+                 batch=batch)
+        self.channel_L_label = \
+            Label('PBS rotating on an axle', font_name=font_name,
+                  font_size=size, x=X(xpbs_L), y=Y(ypbs_L+70),
+                  anchor_x='center', anchor_y='center',
+                  color=font_color, batch=batch)
+        self.channel_L_phi = \
+            Label('phi_1', font_name=font_name,
+                  font_size=size, x=X(xpbs_L), y=Y(ypbs_L-70),
+                  anchor_x='center', anchor_y='center',
+                  color=font_color, batch=batch)
+
+        self.channel_R_border = \
+            Arc(x=X(xpbs_R), y=Y(ypbs_R), radius=S(50),
+                color=border_color, batch=batch)
+        self.channel_R_dial = \
+            Line(x=X(xpbs_R), y=Y(ypbs_R), x2=X(xpbs_R+50*cos(φ2)),
+                 y2=Y(ypbs_R+50*sin(φ2)), color=dial_color,
+                 batch=batch)
+        self.channel_R_label = \
+            Label('PBS rotating on an axle', font_name=font_name,
+                  font_size=size, x=X(xpbs_R), y=Y(ypbs_R+70),
+                  anchor_x='center', anchor_y='center',
+                  color=font_color, batch=batch)
+        self.channel_R_phi = \
+            Label('phi_2 = phi_1 + ' + Δφ_string, font_name=font_name,
+                  font_size=size, x=X(xpbs_R), y=Y(ypbs_R-70),
+                  anchor_x='center', anchor_y='center',
+                  color=font_color, batch=batch)
+
+        self.meter_L_horizontal = \
+            Rectangle(x=X(xmeter_L_horiz-10), y=Y(ymeter), width=S(20),
+                      height=S(4), color=light_color, batch=batch)
+        self.meter_L_vertical = \
+            Rectangle(x=X(xmeter_L_vert-2), y=Y(ymeter), width=S(4),
+                      height=S(20), color=light_color, batch=batch)
+        self.meter_L_axis = \
+            Line(x=X(xmeter_L_axis), y=Y(ymeter), x2=X(xmeter_L_axis),
+                 y2=Y(ymeter + meter_height), color=border_color,
+                 batch=batch)
+        self.meter_L_tics = \
+            [Line(x=X(xmeter_L_axis-3), y=Y(ymeter+(i*meter_height/10)),
+                  x2=X(xmeter_L_axis+2), y2=Y(ymeter+(i*meter_height/10)),
+                  color=border_color, batch=batch)
+             for i in range(11)]
+        self.meter_L_label = \
+            Label('Detector predominance', font_name=font_name,
+                  font_size=size, x=X(xmeter_L_axis+10),
+                  y=Y(ymeter+meter_height+15), anchor_x='center',
+                  anchor_y='bottom', color=font_color, batch=batch)
+        self.meter_L_plus = \
+            Label('+', font_name=font_name, font_size=size*2,
+                  x=X(xmeter_L_axis-50), y=Y(ymeter+meter_height),
+                  anchor_x='center', anchor_y='top', color=font_color,
+                  batch=batch)
+        self.meter_L_minus = \
+            Label('−', font_name=font_name, font_size=size*2,
+                  x=X(xmeter_L_axis-50), y=Y(ymeter), anchor_x='center',
+                  anchor_y='bottom', color=font_color, batch=batch)
+
+        self.meter_R_horizontal = \
+            Rectangle(x=X(xmeter_R_horiz-10), y=Y(ymeter), width=S(20),
+                      height=S(4), color=light_color, batch=batch)
+        self.meter_R_vertical = \
+            Rectangle(x=X(xmeter_R_vert-2), y=Y(ymeter), width=S(4),
+                      height=S(20), color=light_color, batch=batch)
+        self.meter_R_axis = \
+            Line(x=X(xmeter_R_axis), y=Y(ymeter), x2=X(xmeter_R_axis),
+                 y2=Y(ymeter + meter_height), color=border_color,
+                 batch=batch)
+        self.meter_R_tics = \
+            [Line(x=X(xmeter_R_axis-3), y=Y(ymeter+(i*meter_height/10)),
+                  x2=X(xmeter_R_axis+2), y2=Y(ymeter+(i*meter_height/10)),
+                  color=border_color, batch=batch)
+             for i in range(11)]
+        self.meter_R_label = \
+            Label('Detector predominance', font_name=font_name,
+                  font_size=size, x=X(xmeter_R_axis-20),
+                  y=Y(ymeter+meter_height+15), anchor_x='center',
+                  anchor_y='bottom', color=font_color, batch=batch)
+        self.meter_R_plus = \
+            Label('+', font_name=font_name, font_size=size*2,
+                  x=X(xmeter_R_axis+35), y=Y(ymeter+meter_height),
+                  anchor_x='center', anchor_y='top', color=font_color,
+                  batch=batch)
+        self.meter_R_minus = \
+            Label('−', font_name=font_name, font_size=size*2,
+                  x=X(xmeter_R_axis+35), y=Y(ymeter), anchor_x='center',
+                  anchor_y='bottom', color=font_color, batch=batch)
+
+        self.join1 = \
+            Line(x=X(xmeter_L_horiz+10), y=Y(ymeter),
+                 x2=X(xmeter_R_vert-2), y2=Y(ymeter),
+                 color=join12_color, batch=batch)
+        self.join2 = \
+            Line(x=X(xmeter_L_vert+2), y=Y(ymeter),
+                 x2=X(xmeter_R_horiz-10), y2=Y(ymeter),
+                 color=join12_color, batch=batch)
+        self.join3 = \
+            Line(x=X(xmeter_L_horiz+10), y=Y(ymeter),
+                 x2=X(xmeter_R_horiz-10), y2=Y(ymeter),
+                 color=join34_color, batch=batch)
+        self.join4 = \
+            Line(x=X(xmeter_L_vert+2), y=Y(ymeter),
+                 x2=X(xmeter_R_vert-2), y2=Y(ymeter),
+                 color=join34_color, batch=batch)
+
+        self.correlation_coef = \
+            Label(text=rho_text, font_name=font_name,
+                  font_size=size, x=X(xrho), y=Y(yrho),
+                  anchor_x='left', anchor_y='top', color=font_color,
+                  batch=batch)
+
+    def X(self, x):
+        return self.x + self.scale * x
+
+    def Y(self, y):
+        return self.y + self.scale * y
+
+    def S(self, length):
+        return self.scale * length
+
+    def show(self, φ1, φ2, reading):
+        """Move the dials and meters, and set the correlation
+        coefficient."""
+        (X, Y, S) = (self.X, self.Y, self.S)
+
+        self.channel_L_dial.x2 = X(xpbs_L + 50*cos(φ1))
+        self.channel_L_dial.y2 = Y(ypbs_L + 50*sin(φ1))
+
+        self.channel_R_dial.x2 = X(xpbs_R + 50*cos(φ2))
+        self.channel_R_dial.y2 = Y(ypbs_R + 50*sin(φ2))
+
+        if reading is None:
+            return
+
+        self.meter_L_horizontal.y = \
+            Y(ymeter - 2 + meter_height*(1.0 - reading.detL_horiz))
+        self.meter_L_vertical.y = \
+            Y(ymeter - 10 + meter_height*(1.0 - reading.detL_vert))
+
+        self.meter_R_horizontal.y = \
+            Y(ymeter - 2 + meter_height*(1.0 - reading.detR_horiz))
+        self.meter_R_vertical.y = \
+            Y(ymeter - 10 + meter_height*(1.0 - reading.detR_vert))
+
+        self.join1.y = self.meter_L_horizontal.y + S(2)
+        self.join1.y2 = self.meter_R_vertical.y + S(10)
+
+        self.join2.y = self.meter_L_vertical.y + S(10)
+        self.join2.y2 = self.meter_R_horizontal.y + S(2)
+
+        self.join3.y = self.meter_L_horizontal.y + S(2)
+        self.join3.y2 = self.meter_R_horizontal.y + S(2)
+
+        self.join4.y = self.meter_L_vertical.y + S(10)
+        self.join4.y2 = self.meter_R_vertical.y + S(10)
+
+        self.correlation_coef.text = \
+            rho_text + f'{reading.ρ_filtered:+8.5f}'
+
+class BellTestWindow(pyglet.window.Window):
+    """What the windows have in common: a title, a model stepped each
+    frame and shown by the show method, and optionally the governor's
+    rate and the profiler's overlay."""
+
+    def __init__(self, width, height, title, model, profiler=None,
+                 overlay=False, governor=None):
+        super().__init__(width, height, "Quantum Correlations Visualized")
+        pyglet.gl.glClearColor(1, 1, 1, 1)
+        self.profiler = profiler
+        self.model = model
+        self.batch = pyglet.graphics.Batch()
+
+        self.bell_test = \
+            Label(title, font_name=font_name, font_size=font_size*1.5,
+                  x=width/2, y=height-20, anchor_x='center',
+                  anchor_y='top', color=font_color, batch=self.batch)
+
+        self.escape = \
+            Label('Press ESC to exit.', font_name=font_name,
+                  font_size=font_size, x=width-150, y=10,
+                  anchor_x='center', anchor_y='bottom',
+                  color=font_color, batch=self.batch)
+
+        self.governor_label = None
+        if governor is not None:
+            self.governor_label = \
+                Label('', font_name=font_name, font_size=font_size,
+                      x=10, y=10, anchor_x='left', anchor_y='bottom',
+                      color=font_color, batch=self.batch)
+            pyglet.clock.schedule_interval(self.update_governor_label, 0.5)
+
+        self.overlay = None
+        if profiler is not None and overlay:
+            self.overlay = \
+                Label('', font_name='monospace', font_size=font_size*0.8,
+                      x=10, y=height-40, width=300, multiline=True,
+                      anchor_x='left', anchor_y='top',
+                      color=(90, 90, 90, 255), batch=self.batch)
+            pyglet.clock.schedule_interval(self.update_overlay, 0.5)
+
+    def on_draw(self):
+        """Clear the screen and draw the visualization."""
+        if self.profiler is None:
+            self.clear()
+            self.batch.draw()
+            return
+        start = perf_counter()
+        self.clear()
+        self.batch.draw()
+        self.profiler.frame('on_draw', perf_counter() - start)
+
+    def update_governor_label(self, Δt):
+        governor = self.model.governor
+        self.governor_label.text = \
+            (f'{governor.events_per_second():,.0f} photon pairs/s, '
+             f'{governor.runLength:,} per frame')
+
+    def update_overlay(self, Δt):
+        self.overlay.text = '\n'.join(self.profiler.summary())
+
+    def on_close(self):
+        self.model.close()
+        super().on_close()
+
+    def update(self, Δt):
+        """Animate the visualization."""
+        if self.profiler is None:
+            self.show(self.model.step(Δt))
+            return
+        start = perf_counter()
+        reading = self.model.step(Δt)
+        with self.profiler.stage('display'):
+            self.show(reading)
+        self.profiler.frame('update', perf_counter() - start)
+
+    def angles(self):
+        """Compute the current angles of the channels."""
+        return self.model.angles()
+
+class QuantumCorrelationsVisualized(BellTestWindow):
+
+    def __init__(self, Δφ_string, Δφ, countData = countData,
+                 worker = False, sliding_window = None, profiler = None,
+                 overlay = False, governor = None):
+        model = BellTest(Δφ, countData, worker=worker,
+                         sliding_window=sliding_window,
+                         profiler=profiler, governor=governor)
+        super().__init__(700, 500,
+                         'Two-channel Bell test (simulated randomly)',
+                         model, profiler, overlay, governor)
+        self.panel = Panel(self.batch, Δφ_string, *self.angles())
+
+    def show(self, reading):
+        self.panel.show(*self.angles(), reading)
+
+class QuantumCorrelationsPanels(BellTestWindow):
+    """Several experiments side by side, one for each Δφ, in up to
+    three columns, simulated together by BellTests."""
+
+    def __init__(self, Δφ_strings, Δφs, countData_panels = countData_panels,
+                 profiler = None, overlay = False, governor = None):
+        model = BellTests(Δφs, countData_panels, profiler=profiler,
+                          governor=governor)
+        columns = min(len(Δφs), 3)
+        rows = ceil(len(Δφs) / columns)
+        width = panel_right - panel_left
+        scale = min(1.0, panels_width / (columns * width))
+        width *= scale
+        height = scale * (panel_top - panel_bottom)
+        super().__init__(round(columns * width), round(rows * height) + 70,
+                         'Two-channel Bell tests (simulated randomly, '
+                         'from the same photon pairs)',
+                         model, profiler, overlay, governor)
+        (φ1, φ2s) = self.angles()
+        self.panels = \
+            [Panel(self.batch, Δφ_string, φ1, φ2,
+                   x=(i % columns) * width - scale * panel_left,
+                   y=(30 + (rows - 1 - i // columns) * height
+                      - scale * panel_bottom),
+                   scale=scale)
+             for (i, (Δφ_string, φ2)) in enumerate(zip(Δφ_strings, φ2s))]
+
+    def show(self, readings):
+        (φ1, φ2s) = self.angles()
+        for (panel, φ2, reading) in zip(self.panels, φ2s, readings):
+            panel.show(φ1, φ2, reading)
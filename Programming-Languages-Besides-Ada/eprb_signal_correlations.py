@@ -23,9 +23,139 @@
 # ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
 # OTHER DEALINGS IN THE SOFTWARE.
 
+import sys
+import os
+import json
+import mmap
+import struct
+import tracemalloc
+from argparse import ArgumentParser
+from contextlib import nullcontext
+from threading import Lock
+from time import monotonic, perf_counter
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
-from math import pi, cos, sin, sqrt
-from random import random, seed
+from math import pi, cos, sin, sqrt, log, floor, ceil, lgamma
+from random import Random, SystemRandom
+
+# The module random is itself a generator, the global one, and is the
+# default wherever a generator may be given.
+import random as globalRandom
+
+# NumPy is optional, and is imported only when something needs it.
+numpy = None
+
+def importNumpy():
+    """Import NumPy, if that has not been done yet, and return it; or
+    raise ImportError if it is not installed."""
+    global numpy
+    if numpy is None:
+        import numpy as module
+        numpy = module
+    return numpy
+
+# Opt-in instrumentation. The profiler is None unless profiling is
+# enabled, and the instrumented code checks for None once per chunk of
+# events, so profiling costs nothing worth measuring when off.
+
+class ProfileStage:
+    """Accumulated wall time of one stage of the work."""
+
+    __slots__ = ('calls', 'seconds', 'events', 'started')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.events = 0
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, *exception):
+        self.seconds += perf_counter() - self.started
+        self.calls += 1
+
+class Profiler:
+    """Wall time and events per second for each stage of the work
+    ('simulate', which includes drawing the random numbers and
+    assigning the tags, these being done in one loop; 'tabulate';
+    'estimate'; and 'workers', the wait for worker processes, whose
+    own stages are not recorded), and with traceMemory the peak
+    memory use as traced by tracemalloc, which slows the simulation
+    a good deal."""
+
+    def __init__(self, traceMemory = False):
+        self.stages = {}
+        self.started = perf_counter()
+        self.traceMemory = traceMemory
+        if traceMemory:
+            tracemalloc.start()
+
+    def stage(self, name, events = 0):
+        """Return a context manager that charges its time, and the
+        given number of events, to the named stage."""
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = ProfileStage()
+        stage.events += events
+        return stage
+
+    def timeChunks(self, name, chunks):
+        """Pass through the count tuples of chunks, charging the
+        time to make each, and its events, to the named stage."""
+        chunks = iter(chunks)
+        while True:
+            with self.stage(name) as stage:
+                counts = next(chunks, None)
+            if counts is None:
+                return
+            stage.events += sum(counts)
+            yield counts
+
+    def report(self):
+        wall = perf_counter() - self.started
+        report = {'wallSeconds': wall, 'stages': {}}
+        for (name, stage) in self.stages.items():
+            report['stages'][name] = {
+                'calls': stage.calls,
+                'seconds': stage.seconds,
+                'share': (stage.seconds / wall if wall > 0 else None),
+                'events': stage.events,
+                'eventsPerSecond': (stage.events / stage.seconds
+                                    if stage.events and stage.seconds > 0
+                                    else None)}
+        if self.traceMemory:
+            (current, peak) = tracemalloc.get_traced_memory()
+            report['tracemalloc'] = {'currentBytes': current,
+                                     'peakBytes': peak}
+        return report
+
+    def write(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent = 2)
+            file.write('\n')
+
+profiler = None
+unprofiled = nullcontext()
+
+def enableProfiling(traceMemory = False):
+    global profiler
+    profiler = Profiler(traceMemory)
+    return profiler
+
+def disableProfiling():
+    global profiler
+    if profiler is not None and profiler.traceMemory:
+        tracemalloc.stop()
+    profiler = None
+
+def profiling(name, events = 0):
+    """profiler.stage(name, events), or a context manager that does
+    nothing if profiling is off."""
+    return (unprofiled if profiler is None
+            else profiler.stage(name, events))
 
 π     = pi
 π_2   = π / 2.0
@@ -45,34 +175,343 @@ class Tag(Enum):
     CIRCLED_MINUS = 2
 
 class TaggedSignal:
+    __slots__ = ('τ', 'σ')
+
     def __init__(self, τ, σ):
         assert(type(τ) is type(Tag.CIRCLED_PLUS))
         assert(type(σ) is type(Signal.COUNTERCLOCKWISE))
         self.τ = τ
         self.σ = σ
 
-def assignTag(ζ, σ):
+# Eight counts of a run, in the order
+#
+#   (counterclockwise ⊕⊕, counterclockwise ⊕⊖,
+#    counterclockwise ⊖⊕, counterclockwise ⊖⊖,
+#    clockwise ⊕⊕, clockwise ⊕⊖, clockwise ⊖⊕, clockwise ⊖⊖).
+#
+def countIndex(σ, τ1, τ2):
+    return 4 * (σ.value - 1) + 2 * (τ1.value - 1) + (τ2.value - 1)
+
+class RawData:
+    """Events packed one to a byte, each byte being the countIndex
+    of the event. Iterating gives (TaggedSignal, TaggedSignal) pairs,
+    as from a list of events."""
+
+    def __init__(self, codes = b''):
+        self.codes = (codes if isinstance(codes, bytearray)
+                      else bytearray(codes))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return RawData(self.codes[i])
+        code = self.codes[i]
+        σ = (Signal.COUNTERCLOCKWISE if code < 4 else Signal.CLOCKWISE)
+        τ1 = (Tag.CIRCLED_PLUS if code & 2 == 0 else Tag.CIRCLED_MINUS)
+        τ2 = (Tag.CIRCLED_PLUS if code & 1 == 0 else Tag.CIRCLED_MINUS)
+        return (TaggedSignal(τ = τ1, σ = σ), TaggedSignal(τ = τ2, σ = σ))
+
+    def __iter__(self):
+        for i in range(len(self.codes)):
+            yield self[i]
+
+    def append(self, pair):
+        (σ1, σ2) = pair
+        assert(σ1.σ == σ2.σ)
+        self.codes.append(countIndex(σ1.σ, σ1.τ, σ2.τ))
+
+    def count(self, σ, τ1, τ2):
+        return self.codes.count(countIndex(σ, τ1, τ2))
+
+def assignTag(ζ, σ, rng = globalRandom):
     assert(type(σ) is type(Signal.COUNTERCLOCKWISE))
-    r = random()
+    r = rng.random()
     if σ == Signal.COUNTERCLOCKWISE:
         τ = (Tag.CIRCLED_PLUS if r < cos(ζ) ** 2 else Tag.CIRCLED_MINUS)
     else:
         τ = (Tag.CIRCLED_PLUS if r < sin(ζ) ** 2 else Tag.CIRCLED_MINUS)
     return TaggedSignal(τ = τ, σ = σ)
 
-def collectData(ζ1, ζ2, runLength):
-    data = []
-    for i in range(runLength):
-        σ = (Signal.COUNTERCLOCKWISE if random() < 0.5 else Signal.CLOCKWISE)
-        σ1 = assignTag(ζ = ζ1, σ = σ)
-        σ2 = assignTag(ζ = ζ2, σ = σ)
-        data.append((σ1, σ2))
-    return data
+samplers = ('plain', 'stratified', 'antithetic', 'halton', 'bitsliced')
+
+def radicalInverse(i, base):
+    x = 0.0
+    f = 1.0 / base
+    while i > 0:
+        x += (i % base) * f
+        i //= base
+        f /= base
+    return x
+
+def uniforms(sampler, runLength, rng = globalRandom):
+    """Generate a triple (u, r1, r2) of uniform deviates for each
+    event of a run: u < 0.5 makes the signal counterclockwise, and r1
+    and r2 decide the tags as in assignTag. The samplers are
+
+      'plain'       independent draws from rng.random();
+
+      'stratified'  events in pairs, one of each signal, in random
+                    order, so the signals are split exactly 50/50;
+
+      'antithetic'  events in pairs with the same signal, the second
+                    taking 1 − r1 and 1 − r2 for its tags;
+
+      'halton'      the Halton sequence in bases 2, 3 and 5, shifted
+                    modulo 1 by a random vector, which keeps the
+                    estimates unbiased.
+
+    The 'bitsliced' sampler works on whole chunks of events rather
+    than deviates; see bitsliceCodes."""
+    random = rng.random
+    if sampler == 'plain':
+        for i in range(runLength):
+            yield (random(), random(), random())
+    elif sampler == 'stratified':
+        for i in range(runLength // 2):
+            (a, b) = ((0.25, 0.75) if random() < 0.5 else (0.75, 0.25))
+            yield (a, random(), random())
+            yield (b, random(), random())
+        if runLength % 2 == 1:
+            yield (random(), random(), random())
+    elif sampler == 'antithetic':
+        for i in range(runLength // 2):
+            (u, r1, r2) = (random(), random(), random())
+            yield (u, r1, r2)
+            yield (u, 1.0 - r1, 1.0 - r2)
+        if runLength % 2 == 1:
+            yield (random(), random(), random())
+    elif sampler == 'halton':
+        (shift0, shift1, shift2) = (random(), random(), random())
+        for i in range(1, runLength + 1):
+            yield ((radicalInverse(i, 2) + shift0) % 1.0,
+                   (radicalInverse(i, 3) + shift1) % 1.0,
+                   (radicalInverse(i, 5) + shift2) % 1.0)
+    else:
+        raise ValueError(f'unknown sampler {sampler!r}')
+
+# The bitsliced sampler gives each event one bit for its signal and a
+# 31-bit deviate for each tag, 63 random bits in all, but stores them
+# transposed: bit j of each of a few big integers belongs to event j,
+# so that one integer operation works on a whole chunk of events at
+# once. A tag is ⊕ if its deviate is below ceil(p·2³¹), p being the
+# probability of ⊕. The resolution is therefore 2⁻³¹, and each
+# probability is too high by less than 2⁻³¹ (about 5·10⁻¹⁰), a bias
+# far below the statistical error of any run that can be simulated.
+bitsliceWidth = 31
+bitsliceChunkSize = 1 << 16
+bitsliceDigits = bytes.maketrans(b'01234567', bytes(range(8)))
+
+def bitsliceBelow(n, p, getrandbits):
+    """Return an n-bit integer whose bit j is set if the jth of n
+    random bitsliceWidth-bit deviates is below the threshold for p.
+    The deviates are compared a bit plane at a time, from the most
+    significant, and planes are drawn only while some comparison is
+    still undecided."""
+    threshold = ceil(p * (1 << bitsliceWidth))
+    undecided = (1 << n) - 1
+    if threshold >> bitsliceWidth:
+        return undecided        # Every deviate is below.
+    below = 0
+    for k in reversed(range(bitsliceWidth)):
+        if undecided == 0:
+            break
+        plane = getrandbits(n)
+        if (threshold >> k) & 1:
+            below |= undecided & ~plane
+            undecided &= plane
+        else:
+            undecided &= ~plane
+    return below
+
+def bitsliceCodes(n, c1, s1, c2, s2, rng):
+    """The countIndex of each of n events, as a bytearray, for tags
+    ⊕ with probabilities c1 and c2 if counterclockwise, s1 and s2 if
+    clockwise."""
+    getrandbits = rng.getrandbits
+    clockwise = getrandbits(n)
+    minus1 = ~((bitsliceBelow(n, c1, getrandbits) & ~clockwise) |
+               (bitsliceBelow(n, s1, getrandbits) & clockwise))
+    minus2 = ~((bitsliceBelow(n, c2, getrandbits) & ~clockwise) |
+               (bitsliceBelow(n, s2, getrandbits) & clockwise))
+    # Reading a binary numeral as hexadecimal moves bit j to bit 4j,
+    # which leaves room to add the three bits of each countIndex
+    # together; the hexadecimal digits of the sum are then the codes.
+    mask = (1 << n) - 1
+    spread = [int(format(bits & mask, f'0{n}b'), 16)
+              for bits in (clockwise, minus1, minus2)]
+    digits = (spread[0] << 2) | (spread[1] << 1) | spread[2]
+    return bytearray(format(digits, f'0{n}x').encode('ascii')
+                     .translate(bitsliceDigits))
+
+def collectData(ζ1, ζ2, runLength, sampler = 'plain', rng = globalRandom):
+    # This is assignTag done inline, writing the countIndex of each
+    # event rather than TaggedSignal objects.
+    random = rng.random
+    c1 = cos(ζ1) ** 2
+    s1 = sin(ζ1) ** 2
+    c2 = cos(ζ2) ** 2
+    s2 = sin(ζ2) ** 2
+    codes = bytearray(runLength)
+    if sampler == 'plain':
+        for i in range(runLength):
+            if random() < 0.5:
+                codes[i] = ((0 if random() < c1 else 2) +
+                            (0 if random() < c2 else 1))
+            else:
+                codes[i] = (4 + (0 if random() < s1 else 2) +
+                            (0 if random() < s2 else 1))
+    elif sampler == 'bitsliced':
+        codes = bytearray()
+        for start in range(0, runLength, bitsliceChunkSize):
+            codes += bitsliceCodes(min(bitsliceChunkSize,
+                                       runLength - start),
+                                   c1, s1, c2, s2, rng)
+    else:
+        i = 0
+        for (u, r1, r2) in uniforms(sampler, runLength, rng):
+            if u < 0.5:
+                codes[i] = ((0 if r1 < c1 else 2) + (0 if r2 < c2 else 1))
+            else:
+                codes[i] = (4 + (0 if r1 < s1 else 2) +
+                            (0 if r2 < s2 else 1))
+            i += 1
+    return RawData(codes)
+
+def streamData(ζ1, ζ2, runLength, chunkSize = 1 << 16, sampler = 'plain',
+               rng = globalRandom):
+    """Generate the events of a run as RawData chunks. The chunks
+    together hold the same events as collectData would return."""
+    remaining = runLength
+    while remaining > 0:
+        m = min(remaining, chunkSize)
+        with profiling('simulate', m):
+            data = collectData(ζ1, ζ2, m, sampler, rng)
+        yield data
+        remaining -= m
+
+# An event file holds the RawData codes of one run, one byte to an
+# event, after a header of
+#
+#   magic           8 bytes, eventFileMagic
+#   header size     uint32, where the codes begin
+#   φ1, φ2          float64
+#   events          uint64
+#   seed            UTF-8, the rest of the header
+#
+# all little-endian. The seed is that of the Simulator that wrote the
+# file, as text; an integer seed is written in decimal.
+eventFileMagic = b'EPRBEVT1'
+eventFileHeader = struct.Struct('<8sIddQ')
+eventFileChunkSize = 1 << 24
+
+class EventFileWriter:
+    """Write RawData chunks to an event file as they come, so a run
+    of any length can be saved in constant memory."""
+
+    def __init__(self, path, φ1, φ2, seedValue = None):
+        self.φ1 = φ1
+        self.φ2 = φ2
+        self.seedText = ('' if seedValue is None
+                         else str(seedValue)).encode('utf-8')
+        self.count = 0
+        self.file = open(path, 'wb')
+        self.writeHeader()
+
+    def writeHeader(self):
+        self.file.write(eventFileHeader.pack(
+            eventFileMagic, eventFileHeader.size + len(self.seedText),
+            self.φ1, self.φ2, self.count))
+        self.file.write(self.seedText)
+
+    def write(self, rawData):
+        self.file.write(rawData.codes)
+        self.count += len(rawData)
+
+    def close(self):
+        if not self.file.closed:
+            self.file.seek(0)
+            self.writeHeader()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+class EventFile:
+    """An event file, memory-mapped, so that runs far larger than
+    memory can be tabulated a chunk at a time, the page cache doing
+    the reading. Iterating gives (TaggedSignal, TaggedSignal) pairs,
+    as from RawData."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            head = file.read(len(eventFileMagic))
+            if size == 0 or not eventFileMagic.startswith(head):
+                raise ValueError(f'{path} is not an event file')
+            if size < eventFileHeader.size:
+                raise ValueError(f'{path} is truncated')
+            self.map = mmap.mmap(file.fileno(), 0,
+                                 access = mmap.ACCESS_READ)
+        try:
+            (magic, self.start, self.φ1, self.φ2, self.count) = \
+                eventFileHeader.unpack_from(self.map)
+            if magic != eventFileMagic or self.start < eventFileHeader.size:
+                raise ValueError(f'{path} is not an event file')
+            if self.start + self.count > len(self.map):
+                raise ValueError(f'{path} is truncated')
+            seedText = (self.map[eventFileHeader.size : self.start]
+                        .decode('utf-8'))
+        except BaseException:
+            self.map.close()
+            raise
+        self.seedValue = (int(seedText) if seedText.isdecimal()
+                          else seedText or None)
+        if hasattr(self.map, 'madvise'):
+            self.map.madvise(mmap.MADV_SEQUENTIAL)
+
+    def __len__(self):
+        return self.count
+
+    def chunks(self, chunkSize = eventFileChunkSize):
+        """Generate the events as RawData chunks."""
+        end = self.start + self.count
+        for i in range(self.start, end, chunkSize):
+            yield RawData(self.map[i : min(i + chunkSize, end)])
+
+    def __iter__(self):
+        for chunk in self.chunks():
+            yield from chunk
+
+    def close(self):
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+def writeEvents(path, φ1, φ2, runLength, simulator, chunkSize = 1 << 16):
+    """Simulate a run with the given Simulator and save its events,
+    streaming them to the file."""
+    with EventFileWriter(path, φ1, φ2, simulator.seedValue) as writer:
+        for data in simulator.streamData(φ1, φ2, runLength, chunkSize):
+            with profiling('write', len(data)):
+                writer.write(data)
 
 def count(rawData, σ, τ1, τ2):
     assert(type(σ) is type(Signal.COUNTERCLOCKWISE))
     assert(type(τ1) is type(Tag.CIRCLED_PLUS))
     assert(type(τ2) is type(Tag.CIRCLED_PLUS))
+    if isinstance(rawData, RawData):
+        return rawData.count(σ, τ1, τ2)
+    if isinstance(rawData, EventFile):
+        return sum(chunk.count(σ, τ1, τ2) for chunk in rawData.chunks())
     n = 0
     for pair in rawData:
         assert(pair[0].σ == pair[1].σ)
@@ -83,6 +522,96 @@ def count(rawData, σ, τ1, τ2):
 def frequency(rawData, σ, τ1, τ2):
     return count(rawData, σ, τ1, τ2) / len(rawData)
 
+# The NumPy engine draws this many events at a time, so memory stays
+# bounded however long the run.
+numpy_chunk_size = 1 << 20
+
+def streamCounts_numpy(ζ1, ζ2, runLength, chunkSize = numpy_chunk_size,
+                       rng = globalRandom):
+    importNumpy()
+    # Seed from the given generator, so that seeding it governs this
+    # engine, too.
+    generator = numpy.random.default_rng(rng.getrandbits(64))
+    p1 = numpy.array([cos(ζ1) ** 2, sin(ζ1) ** 2])
+    p2 = numpy.array([cos(ζ2) ** 2, sin(ζ2) ** 2])
+    remaining = runLength
+    while remaining > 0:
+        m = min(remaining, chunkSize)
+        # 0 is counterclockwise, 1 is clockwise; likewise 0 is ⊕ and
+        # 1 is ⊖.
+        σ = (generator.random(m) >= 0.5).astype(numpy.intp)
+        τ1 = (generator.random(m) >= p1[σ])
+        τ2 = (generator.random(m) >= p2[σ])
+        counts = numpy.bincount(4 * σ + 2 * τ1 + τ2, minlength = 8)
+        yield tuple(int(n) for n in counts)
+        remaining -= m
+
+def countData_numpy(ζ1, ζ2, runLength, rng = globalRandom):
+    importNumpy()
+    table = ContingencyTable()
+    for counts in streamCounts_numpy(ζ1, ζ2, runLength, rng = rng):
+        table.addCounts(counts)
+    return tuple(table.counts)
+
+def binomial(n, p, rng = globalRandom):
+    """Draw from the binomial distribution, using rng.random(), in
+    time independent of n. This is the BTRS method of Hörmann, with
+    Devroye's geometric method for small n·p."""
+    random = rng.random
+    if p <= 0.0:
+        return 0
+    if p >= 1.0:
+        return n
+    if p > 0.5:
+        return n - binomial(n, 1.0 - p, rng)
+    if n * p < 10.0:
+        k = 0
+        y = 0
+        c = log(1.0 - p)
+        if c == 0.0:
+            return 0            # p is too small to matter.
+        while True:
+            y += floor(log(1.0 - random()) / c) + 1
+            if y > n:
+                return k
+            k += 1
+    spq = sqrt(n * p * (1.0 - p))
+    b = 1.15 + 2.53 * spq
+    a = -0.0873 + 0.0248 * b + 0.01 * p
+    c = n * p + 0.5
+    vr = 0.92 - 4.2 / b
+    alpha = (2.83 + 5.1 / b) * spq
+    lpq = log(p / (1.0 - p))
+    m = floor((n + 1) * p)
+    h = lgamma(m + 1) + lgamma(n - m + 1)
+    while True:
+        u = random() - 0.5
+        us = 0.5 - abs(u)
+        k = floor((2.0 * a / us + b) * u + c)
+        if k < 0 or k > n:
+            continue
+        v = random()
+        if us >= 0.07 and v <= vr:
+            return k
+        v *= alpha / (a / (us * us) + b)
+        if log(v) <= h - lgamma(k + 1) - lgamma(n - k + 1) + (k - m) * lpq:
+            return k
+
+def countData_multinomial(ζ1, ζ2, runLength, rng = globalRandom):
+    """Draw the eight counts of a run directly from their multinomial
+    distribution, without simulating the events. The signal is drawn
+    first, then the tags, just as for a single event."""
+    n_ccw = binomial(runLength, 0.5, rng)
+    counts = []
+    for (n, p1, p2) in ((n_ccw, cos(ζ1) ** 2, cos(ζ2) ** 2),
+                        (runLength - n_ccw, sin(ζ1) ** 2, sin(ζ2) ** 2)):
+        n_plus = binomial(n, p1, rng)
+        n_plus_plus = binomial(n_plus, p2, rng)
+        n_minus_plus = binomial(n - n_plus, p2, rng)
+        counts += [n_plus_plus, n_plus - n_plus_plus,
+                   n_minus_plus, n - n_plus - n_minus_plus]
+    return tuple(counts)
+
 def cosine_sign(φ):
     return (-1.0 if cos(φ) < 0.0 else 1.0)
 
@@ -101,23 +630,64 @@ def sc_sign(φ1, φ2):
 def ss_sign(φ1, φ2):
     return sine_sign(φ1) * sine_sign(φ2)
 
+class ContingencyTable:
+    """The eight counts of a run, in the order of countIndex. More
+    data can be added as it arrives, so a table serves also as an
+    accumulator for streamed runs."""
+
+    def __init__(self, counts = (0,) * 8):
+        assert(len(counts) == 8)
+        self.counts = list(counts)
+
+    def add(self, rawData):
+        self.addCounts(tabulate(rawData).counts)
+
+    def addCounts(self, counts):
+        assert(len(counts) == 8)
+        for i in range(8):
+            self.counts[i] += counts[i]
+
+    def __len__(self):
+        return sum(self.counts)
+
+    def count(self, σ, τ1, τ2):
+        return self.counts[countIndex(σ, τ1, τ2)]
+
+    def frequency(self, σ, τ1, τ2):
+        return self.count(σ, τ1, τ2) / len(self)
+
+    def estimate_ρ(self, φ1, φ2):
+        return estimate_ρ_fromCounts(self.counts, φ1, φ2)
+
+def tabulate(rawData):
+    """Count all eight kinds of event in a single pass."""
+    if isinstance(rawData, RawData):
+        # bytearray.count runs at C speed, so eight passes are cheap.
+        return ContingencyTable([rawData.codes.count(i)
+                                 for i in range(8)])
+    if isinstance(rawData, EventFile):
+        table = ContingencyTable()
+        for chunk in rawData.chunks():
+            with profiling('tabulate', len(chunk)):
+                table.add(chunk)
+        return table
+    CCW = Signal.COUNTERCLOCKWISE
+    PLUS = Tag.CIRCLED_PLUS
+    counts = [0] * 8
+    for (σ1, σ2) in rawData:
+        assert(σ1.σ is σ2.σ)
+        counts[(0 if σ1.σ is CCW else 4) +
+               (0 if σ1.τ is PLUS else 2) +
+               (0 if σ2.τ is PLUS else 1)] += 1
+    return ContingencyTable(counts)
+
 def estimate_ρ_fromRawData(rawData, φ1, φ2):
-    ac2c2 = frequency(rawData, Signal.COUNTERCLOCKWISE,
-                      Tag.CIRCLED_PLUS, Tag.CIRCLED_PLUS)
-    ac2s2 = frequency(rawData, Signal.COUNTERCLOCKWISE,
-                      Tag.CIRCLED_PLUS, Tag.CIRCLED_MINUS)
-    as2c2 = frequency(rawData, Signal.COUNTERCLOCKWISE,
-                      Tag.CIRCLED_MINUS, Tag.CIRCLED_PLUS)
-    as2s2 = frequency(rawData, Signal.COUNTERCLOCKWISE,
-                      Tag.CIRCLED_MINUS, Tag.CIRCLED_MINUS)
-    cs2s2 = frequency(rawData, Signal.CLOCKWISE,
-                      Tag.CIRCLED_PLUS, Tag.CIRCLED_PLUS)
-    cs2c2 = frequency(rawData, Signal.CLOCKWISE,
-                      Tag.CIRCLED_PLUS, Tag.CIRCLED_MINUS)
-    cc2s2 = frequency(rawData, Signal.CLOCKWISE,
-                      Tag.CIRCLED_MINUS, Tag.CIRCLED_PLUS)
-    cc2c2 = frequency(rawData, Signal.CLOCKWISE,
-                      Tag.CIRCLED_MINUS, Tag.CIRCLED_MINUS)
+    return tabulate(rawData).estimate_ρ(φ1, φ2)
+
+def estimate_ρ_fromCounts(counts, φ1, φ2):
+    n = sum(counts)
+    (ac2c2, ac2s2, as2c2, as2s2,
+     cs2s2, cs2c2, cc2s2, cc2c2) = (k / n for k in counts)
 
     c2c2 = ac2c2 + cc2c2
     c2s2 = ac2s2 + cc2s2
@@ -134,33 +704,676 @@ def estimate_ρ_fromRawData(rawData, φ1, φ2):
 
     return (c12 * c12) - (s12 * s12)
 
-def estimate_ρ(φ1, φ2, runLength):
-    data = collectData(φ1, φ2, runLength)
-    return estimate_ρ_fromRawData(data, φ1, φ2)
+def estimate_ρ_batch(counts, φ1, φ2):
+    """Do estimate_ρ_fromCounts for K count vectors at once, with
+    NumPy. counts is K×8, in the order of countIndex, and φ1 and φ2
+    have K entries each. Returns the K estimates, the same numbers
+    estimate_ρ_fromCounts gives."""
+    importNumpy()
+    counts = numpy.asarray(counts, dtype = float).reshape(-1, 8)
+    φ1 = numpy.asarray(φ1, dtype = float).reshape(-1)
+    φ2 = numpy.asarray(φ2, dtype = float).reshape(-1)
 
-def printBellTests(delta_φ):
-    runLength = 100000
-    print(f'    φ₂ − φ₁ = {delta_φ / π_180 : 6.2f}°')
-    for i in range(33):
-        φ1 = i * π / 16.0
-        φ2 = φ1 + delta_φ
-        φ1_ = φ1 / π_180
-        φ2_ = φ2 / π_180
-        ρ_ = estimate_ρ(φ1, φ2, runLength)
-        print(f'    φ₁ = {φ1_:6.2f}°  φ₂ = {φ2_:6.2f}°   ρ est. = {ρ_:8.5f}')
-    return
+    n = counts.sum(axis = 1, keepdims = True)
+    (ac2c2, ac2s2, as2c2, as2s2,
+     cs2s2, cs2c2, cc2s2, cc2c2) = (counts / n).T
 
-def main():
-    seed(a = 0, version = 2)
+    c2c2 = ac2c2 + cc2c2
+    c2s2 = ac2s2 + cc2s2
+    s2c2 = as2c2 + cs2c2
+    s2s2 = as2s2 + cs2s2
+
+    # The quadrant signs of cc_sign and the rest.
+    cosine1 = numpy.where(numpy.cos(φ1) < 0.0, -1.0, 1.0)
+    sine1 = numpy.where(numpy.sin(φ1) < 0.0, -1.0, 1.0)
+    cosine2 = numpy.where(numpy.cos(φ2) < 0.0, -1.0, 1.0)
+    sine2 = numpy.where(numpy.sin(φ2) < 0.0, -1.0, 1.0)
+
+    cc = (cosine1 * cosine2) * numpy.sqrt(c2c2)
+    cs = (cosine1 * sine2) * numpy.sqrt(c2s2)
+    sc = (sine1 * cosine2) * numpy.sqrt(s2c2)
+    ss = (sine1 * sine2) * numpy.sqrt(s2s2)
+
+    c12 = cc + ss
+    s12 = sc - cs
+
+    return (c12 * c12) - (s12 * s12)
+
+def streamCounts_python(ζ1, ζ2, runLength, chunkSize = None,
+                        sampler = 'plain', rng = globalRandom):
+    # As streamData, but with the stages timed separately.
+    remaining = runLength
+    while remaining > 0:
+        m = min(remaining, chunkSize or 1 << 16)
+        with profiling('simulate', m):
+            data = collectData(ζ1, ζ2, m, sampler, rng)
+        with profiling('tabulate', m):
+            counts = tabulate(data).counts
+        yield counts
+        remaining -= m
+
+def streamCounts_multinomial(ζ1, ζ2, runLength, chunkSize = None,
+                             rng = globalRandom):
+    remaining = runLength
+    while remaining > 0:
+        m = min(remaining, chunkSize or remaining)
+        with profiling('simulate', m):
+            counts = countData_multinomial(ζ1, ζ2, m, rng)
+        yield counts
+        remaining -= m
+
+# The Numba engine's compiled kernel, once loadNumbaEngine has
+# compiled it.
+countChunk_numba = None
+
+def streamCounts_numba(ζ1, ζ2, runLength, chunkSize = numpy_chunk_size,
+                       rng = globalRandom):
+    # Each chunk is seeded afresh from the given generator, so that
+    # its state alone says where the run is, and a checkpointed run
+    # can be resumed.
+    (c1, s1) = (cos(ζ1) ** 2, sin(ζ1) ** 2)
+    (c2, s2) = (cos(ζ2) ** 2, sin(ζ2) ** 2)
+    remaining = runLength
+    while remaining > 0:
+        m = min(remaining, chunkSize)
+        with profiling('simulate', m):
+            counts = countChunk_numba(c1, s1, c2, s2, m,
+                                      rng.getrandbits(32))
+        yield tuple(int(n) for n in counts)
+        remaining -= m
+
+# The engines, by name. Each is got by a loader, which imports
+# whatever the engine needs, so an engine not chosen costs nothing at
+# startup, and returns a function generate(ζ1, ζ2, runLength,
+# chunkSize, sampler, rng), generating the counts of a run chunk by
+# chunk; or raises ImportError if the engine cannot run here. Only
+# the python engine uses the sampler.
+
+def loadPythonEngine():
+    return streamCounts_python
+
+def loadMultinomialEngine():
+    return (lambda ζ1, ζ2, runLength, chunkSize, sampler, rng:
+            streamCounts_multinomial(ζ1, ζ2, runLength, chunkSize, rng))
+
+def loadNumpyEngine():
+    importNumpy()
+    def generate(ζ1, ζ2, runLength, chunkSize, sampler, rng):
+        chunks = streamCounts_numpy(ζ1, ζ2, runLength,
+                                    chunkSize or numpy_chunk_size, rng)
+        if profiler is not None:
+            chunks = profiler.timeChunks('simulate', chunks)
+        return chunks
+    return generate
+
+def loadNumbaEngine():
+    global countChunk_numba
+    if countChunk_numba is None:
+        import numba
+        importNumpy()
+
+        @numba.njit
+        def countChunk(c1, s1, c2, s2, n, seed):
+            # As streamCounts_numpy, an event at a time.
+            numpy.random.seed(seed)
+            counts = numpy.zeros(8, numpy.int64)
+            for i in range(n):
+                if numpy.random.random() < 0.5:
+                    (σ, p1, p2) = (0, c1, c2)
+                else:
+                    (σ, p1, p2) = (1, s1, s2)
+                τ1 = (0 if numpy.random.random() < p1 else 1)
+                τ2 = (0 if numpy.random.random() < p2 else 1)
+                counts[4 * σ + 2 * τ1 + τ2] += 1
+            return counts
+
+        countChunk(1.0, 0.0, 1.0, 0.0, 1, 0)    # Compile it now.
+        countChunk_numba = countChunk
+    return (lambda ζ1, ζ2, runLength, chunkSize, sampler, rng:
+            streamCounts_numba(ζ1, ζ2, runLength,
+                               chunkSize or numpy_chunk_size, rng))
+
+engines = {'python': loadPythonEngine,
+           'numpy': loadNumpyEngine,
+           'numba': loadNumbaEngine,
+           'multinomial': loadMultinomialEngine}
+
+# The engines simulating events, fastest first. The engine 'auto' is
+# the first of these that can run here, and an engine that cannot run
+# falls back to the next.
+fastestEngines = ('numba', 'numpy', 'python')
+
+loadedEngines = {}
+
+def resolveEngine(engine):
+    """Return the name of the engine to run for the one named: that
+    engine, if it can run here, or else its fallback. A warning is
+    printed, once, when an engine named explicitly cannot run."""
+    if engine in loadedEngines:
+        return loadedEngines[engine][0]
+    if engine == 'auto':
+        candidates = fastestEngines
+    elif engine in fastestEngines:
+        candidates = fastestEngines[fastestEngines.index(engine):]
+    elif engine in engines:
+        candidates = (engine,)
+    else:
+        raise ValueError(f'unknown engine {engine!r}')
+    for name in candidates:
+        try:
+            generate = engines[name]()
+        except ImportError as error:
+            if engine != 'auto':
+                print(f'the {name} engine cannot run here ({error})',
+                      file = sys.stderr)
+            continue
+        loadedEngines[engine] = (name, generate)
+        loadedEngines[name] = (name, generate)
+        return name
+
+def streamCounts(ζ1, ζ2, runLength, engine = 'python', chunkSize = None,
+                 sampler = 'plain', rng = globalRandom):
+    """Generate the counts of a run chunk by chunk. Samplers other
+    than 'plain' are for the Python engine."""
+    engine = resolveEngine(engine)
+    assert(engine == 'python' or sampler == 'plain')
+    yield from loadedEngines[engine][1](ζ1, ζ2, runLength, chunkSize,
+                                        sampler, rng)
+
+def estimate_ρ(φ1, φ2, runLength, engine = 'python', chunkSize = None,
+               report = None, sampler = 'plain', rng = globalRandom):
+    """Estimate ρ in constant memory, folding the run into a
+    ContingencyTable a chunk at a time. If given, report(φ1, φ2,
+    table) is called after each chunk, and may call
+    table.estimate_ρ(φ1, φ2) for an intermediate estimate."""
+    table = ContingencyTable()
+    for counts in streamCounts(φ1, φ2, runLength, engine, chunkSize,
+                               sampler, rng):
+        table.addCounts(counts)
+        if report is not None:
+            report(φ1, φ2, table)
+    with profiling('estimate'):
+        return table.estimate_ρ(φ1, φ2)
+
+def standardError_ρ(counts, φ1, φ2):
+    """Estimate the standard error of estimate_ρ_fromCounts, by the
+    delta method: ρ is a function of the eight frequencies, which are
+    multinomial, so its variance is about gᵀΣg/n, where g is the
+    gradient of ρ with respect to the frequencies and Σ is their
+    covariance for a single event."""
+    n = sum(counts)
+    p = [k / n for k in counts]
+    (ac2c2, ac2s2, as2c2, as2s2,
+     cs2s2, cs2c2, cc2s2, cc2c2) = p
+
+    c2c2 = ac2c2 + cc2c2
+    c2s2 = ac2s2 + cc2s2
+    s2c2 = as2c2 + cs2c2
+    s2s2 = as2s2 + cs2s2
+
+    cc = cc_sign(φ1, φ2) * sqrt(c2c2)
+    cs = cs_sign(φ1, φ2) * sqrt(c2s2)
+    sc = sc_sign(φ1, φ2) * sqrt(s2c2)
+    ss = ss_sign(φ1, φ2) * sqrt(s2s2)
+
+    c12 = cc + ss
+    s12 = sc - cs
+
+    # ρ = c12² − s12², differentiated with respect to each sum of
+    # frequencies. A sum that is zero has only empty cells, which
+    # contribute nothing.
+    def d(x, coefficient, sign):
+        return (coefficient * sign / sqrt(x) if x > 0.0 else 0.0)
+    d_c2c2 = d(c2c2, c12, cc_sign(φ1, φ2))
+    d_s2s2 = d(s2s2, c12, ss_sign(φ1, φ2))
+    d_c2s2 = d(c2s2, s12, cs_sign(φ1, φ2))
+    d_s2c2 = d(s2c2, -s12, sc_sign(φ1, φ2))
+    g = (d_c2c2, d_c2s2, d_s2c2, d_s2s2,
+         d_s2s2, d_s2c2, d_c2s2, d_c2c2)
+
+    mean = sum(p[i] * g[i] for i in range(8))
+    square = sum(p[i] * g[i] * g[i] for i in range(8))
+    return sqrt(max(0.0, square - mean * mean) / n)
+
+def estimate_ρ_adaptive(φ1, φ2, tolerance, maxRunLength,
+                        engine = 'python', batchSize = 10000,
+                        minRunLength = 10000, report = None,
+                        sampler = 'plain', rng = globalRandom):
+    """Simulate in batches until the standard error of the estimate
+    is at most the tolerance, or until maxRunLength events have been
+    simulated. Returns (ρ, standard error, events used)."""
+    table = ContingencyTable()
+    for counts in streamCounts(φ1, φ2, maxRunLength, engine, batchSize,
+                               sampler, rng):
+        table.addCounts(counts)
+        if report is not None:
+            report(φ1, φ2, table)
+        if precise(table, φ1, φ2, tolerance, minRunLength):
+            break
+    return adaptiveResult(table.counts, φ1, φ2)
+
+def precise(table, φ1, φ2, tolerance, minRunLength = 10000):
+    """The stopping rule of estimate_ρ_adaptive."""
+    if len(table) < minRunLength:
+        return False
+    with profiling('estimate'):
+        return standardError_ρ(table.counts, φ1, φ2) <= tolerance
+
+def adaptiveResult(counts, φ1, φ2):
+    return (estimate_ρ_fromCounts(counts, φ1, φ2),
+            standardError_ρ(counts, φ1, φ2), sum(counts))
+
+def varianceReport(φ1, φ2, runLength, replications = 100,
+                   rng = globalRandom):
+    """Compare each sampler with plain sampling, by the spread of
+    its estimates over many runs of the given length. Returns a list
+    of (sampler, standard deviation, effective speedup), the speedup
+    being the ratio of variances: how many times as many events plain
+    sampling would need to reach the same error."""
+    report = []
+    for sampler in samplers:
+        ρs = [estimate_ρ(φ1, φ2, runLength, sampler = sampler, rng = rng)
+              for i in range(replications)]
+        mean = sum(ρs) / replications
+        variance = sum((ρ_ - mean) ** 2 for ρ_ in ρs) / (replications - 1)
+        report.append((sampler, sqrt(variance)))
+    plain = report[0][1]
+    return [(sampler, sd, (plain / sd) ** 2 if sd > 0.0 else float('inf'))
+            for (sampler, sd) in report]
+
+def printVarianceReport(deltas, runLength, replications = 100,
+                        rng = globalRandom):
     print(f'')
-    printBellTests(-π_8)
+    print(f'    {runLength} events per estimate, {replications} estimates'
+          f' per sampler')
+    for delta_φ in deltas:
+        φ1 = 3 * π / 16.0
+        φ2 = φ1 + delta_φ
+        print(f'')
+        print(f'    φ₁ = {φ1 / π_180:6.2f}°  φ₂ = {φ2 / π_180:6.2f}°')
+        for (sampler, sd, speedup) in varianceReport(φ1, φ2, runLength,
+                                                      replications, rng):
+            print(f'    {sampler:>12}   std. dev. = {sd:8.5f}'
+                  f'   speedup = {speedup:7.2f}')
     print(f'')
-    printBellTests(π_8)
+
+class Simulator:
+    """A simulation with a random number generator of its own, so
+    that it neither disturbs nor is disturbed by the global generator
+    or other Simulators. The same seed gives the same results, so
+    Simulators may be run side by side in threads (one thread each)
+    and each still be reproducible. The seed may be anything
+    random.seed accepts; a string is hashed with SHA-512."""
+
+    def __init__(self, seedValue = None, engine = 'python',
+                 sampler = 'plain'):
+        engine = resolveEngine(engine)
+        assert(engine == 'python' or sampler == 'plain')
+        if seedValue is None:
+            seedValue = SystemRandom().getrandbits(64)
+        self.seedValue = seedValue
+        self.engine = engine
+        self.sampler = sampler
+        self.rng = Random(seedValue)
+
+    def spawn(self, key):
+        """Split off a new Simulator, its stream seeded from this
+        one's seed and the key, and so independent of this one's and
+        of any other key's, whatever order they are spawned in."""
+        return Simulator(f'{self.seedValue}:{key}', self.engine,
+                         self.sampler)
+
+    def getstate(self):
+        return self.rng.getstate()
+
+    def setstate(self, state):
+        self.rng.setstate(state)
+
+    def collectData(self, ζ1, ζ2, runLength):
+        return collectData(ζ1, ζ2, runLength, self.sampler, self.rng)
+
+    def streamData(self, ζ1, ζ2, runLength, chunkSize = 1 << 16):
+        return streamData(ζ1, ζ2, runLength, chunkSize, self.sampler,
+                          self.rng)
+
+    def streamCounts(self, ζ1, ζ2, runLength, chunkSize = None):
+        return streamCounts(ζ1, ζ2, runLength, self.engine, chunkSize,
+                            self.sampler, self.rng)
+
+    def countData(self, ζ1, ζ2, runLength):
+        table = ContingencyTable()
+        for counts in self.streamCounts(ζ1, ζ2, runLength):
+            table.addCounts(counts)
+        return tuple(table.counts)
+
+    def estimate_ρ(self, φ1, φ2, runLength, chunkSize = None,
+                   report = None):
+        return estimate_ρ(φ1, φ2, runLength, self.engine, chunkSize,
+                          report, self.sampler, self.rng)
+
+    def estimate_ρ_adaptive(self, φ1, φ2, tolerance, maxRunLength,
+                            batchSize = 10000, minRunLength = 10000,
+                            report = None):
+        return estimate_ρ_adaptive(φ1, φ2, tolerance, maxRunLength,
+                                   self.engine, batchSize, minRunLength,
+                                   report, self.sampler, self.rng)
+
+def printEventFiles(paths):
     print(f'')
-    printBellTests(-3 * π_8)
+    for path in paths:
+        with EventFile(path) as events:
+            ρ_ = estimate_ρ_fromRawData(events, events.φ1, events.φ2)
+            φ1_ = events.φ1 / π_180
+            φ2_ = events.φ2 / π_180
+            print(f'    φ₁ = {φ1_:6.2f}°  φ₂ = {φ2_:6.2f}°   ρ est. = {ρ_:8.5f}'
+                  f'   {len(events):12d} events   {path}')
     print(f'')
-    printBellTests(3 * π_8)
+
+def printProgress(φ1, φ2, table):
+    ρ_ = table.estimate_ρ(φ1, φ2)
+    print(f'    {len(table):14d} events   ρ est. = {ρ_:8.5f}',
+          file = sys.stderr)
+
+def bellTestTasks(deltas):
+    """The (φ1, φ2) of every estimate in a sweep, in printing order."""
+    return [(i * π / 16.0, i * π / 16.0 + delta_φ)
+            for delta_φ in deltas for i in range(33)]
+
+class Checkpoint:
+    """The partial counts of a sweep, saved to a file now and then so
+    that the sweep can be resumed after a crash. For each task begun,
+    the file holds its counts so far and, unless it is finished, the
+    state of its Simulator's generator after the last chunk counted;
+    resuming from there draws exactly the numbers the uninterrupted
+    run would have drawn. The file is JSON, written to a temporary
+    file and renamed over the old one, so it is never half written."""
+
+    def __init__(self, path, sweep, interval = 60.0):
+        self.path = path
+        self.sweep = sweep
+        self.interval = interval
+        self.tasks = {}
+        self.lock = Lock()
+        self.lastSave = monotonic()
+        if os.path.exists(path):
+            with open(path) as file:
+                saved = json.load(file)
+            if saved['sweep'] != sweep:
+                raise ValueError(f'{path} is the checkpoint of '
+                                 f'a different sweep')
+            self.tasks = {int(i): task
+                          for (i, task) in saved['tasks'].items()}
+
+    def task(self, i):
+        """Return (counts, generator state, finished) for task i, or
+        None if it was never begun."""
+        with self.lock:
+            if i not in self.tasks:
+                return None
+            task = self.tasks[i]
+            state = task['state']
+            if state is not None:
+                state = (state[0], tuple(state[1]), state[2])
+            return (tuple(task['counts']), state, task['state'] is None)
+
+    def record(self, i, counts, state = None):
+        """Record the counts of task i so far, with the state to go
+        on from, or with no state once the task is finished. Saves if
+        the task is finished or the interval has passed."""
+        with self.lock:
+            self.tasks[i] = {'counts': list(counts),
+                             'state': (None if state is None
+                                       else [state[0], list(state[1]),
+                                             state[2]])}
+            if state is None or monotonic() - self.lastSave >= self.interval:
+                self.saveLocked()
+
+    def save(self):
+        with self.lock:
+            self.saveLocked()
+
+    def saveLocked(self):
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as file:
+            json.dump({'sweep': self.sweep, 'tasks': self.tasks}, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self.path)
+        self.lastSave = monotonic()
+
+def runTask(task):
+    """Run one estimate of a sweep, starting from the given counts,
+    and return its final counts. After each chunk, record(counts,
+    generator state) is called if given."""
+    (simulator, φ1, φ2, runLength, report, tolerance, counts,
+     record) = task
+    table = ContingencyTable(counts)
+    batchSize = (None if tolerance is None else 10000)
+    if tolerance is None or not precise(table, φ1, φ2, tolerance):
+        for counts in simulator.streamCounts(φ1, φ2,
+                                             runLength - len(table),
+                                             batchSize):
+            table.addCounts(counts)
+            if report is not None:
+                report(φ1, φ2, table)
+            if record is not None:
+                record(table.counts, simulator.getstate())
+            if tolerance is not None and precise(table, φ1, φ2, tolerance):
+                break
+    return tuple(table.counts)
+
+def sweepBellTests(deltas, runLength = 100000, engine = 'python',
+                   report = None, workers = 1, tolerance = None,
+                   sampler = 'plain', rng = globalRandom,
+                   checkpoint = None, checkpointInterval = 60.0):
+    """Generate the estimates of a sweep, in order, running them on
+    a pool of worker processes if workers > 1. Each estimate has a
+    Simulator spawned, by its index in the sweep, from one seeded by
+    rng, so the results are the same for any number of workers. With
+    a tolerance, the run lengths are adaptive, runLength is the most
+    any estimate may use, and the results are as from
+    estimate_ρ_adaptive.
+
+    Given a checkpoint path, the sweep is resumed from that file if it
+    exists, and progress is saved to it at least every
+    checkpointInterval seconds and whenever an estimate is finished.
+    Progress within an estimate is saved only when running on one
+    process, and not for the NumPy engine, whose own generator state
+    is not kept; otherwise such an estimate starts over."""
+    simulator = Simulator(rng.getrandbits(64), engine, sampler)
+    positions = bellTestTasks(deltas)
+    if checkpoint is not None:
+        checkpoint = Checkpoint(checkpoint,
+                                {'deltas': deltas, 'runLength': runLength,
+                                 'engine': engine, 'tolerance': tolerance,
+                                 'sampler': sampler,
+                                 'seed': simulator.seedValue},
+                                checkpointInterval)
+
+    def result(i, counts):
+        (φ1, φ2) = positions[i]
+        with profiling('estimate'):
+            return (estimate_ρ_fromCounts(counts, φ1, φ2)
+                    if tolerance is None
+                    else adaptiveResult(counts, φ1, φ2))
+
+    def task(i, inProcess):
+        (φ1, φ2) = positions[i]
+        spawned = simulator.spawn(i)
+        (counts, record) = ((0,) * 8, None)
+        if checkpoint is not None:
+            saved = checkpoint.task(i)
+            if saved is not None and saved[1] is not None:
+                counts = saved[0]
+                spawned.setstate(saved[1])
+            if inProcess and spawned.engine != 'numpy':
+                record = (lambda counts, state:
+                          checkpoint.record(i, counts, state))
+        return (spawned, φ1, φ2, runLength, report, tolerance, counts,
+                record)
+
+    def finished(i):
+        if checkpoint is None:
+            return None
+        saved = checkpoint.task(i)
+        return (saved[0] if saved is not None and saved[2] else None)
+
+    try:
+        if workers == 1:
+            for i in range(len(positions)):
+                counts = finished(i)
+                if counts is None:
+                    counts = runTask(task(i, True))
+                    if checkpoint is not None:
+                        checkpoint.record(i, counts)
+                yield result(i, counts)
+        else:
+            with ProcessPoolExecutor(workers) as executor:
+                futures = {}
+                for i in range(len(positions)):
+                    if finished(i) is None:
+                        futures[i] = executor.submit(runTask,
+                                                     task(i, False))
+                        if checkpoint is not None:
+                            def done(future, i = i):
+                                if future.exception() is None:
+                                    checkpoint.record(i, future.result())
+                            futures[i].add_done_callback(done)
+                for i in range(len(positions)):
+                    counts = finished(i)
+                    if counts is None:
+                        with profiling('workers'):
+                            counts = futures[i].result()
+                    yield result(i, counts)
+    finally:
+        if checkpoint is not None:
+            checkpoint.save()
+
+def printBellTests(delta_φ, runLength = 100000, engine = 'python',
+                   report = None, workers = 1, tolerance = None,
+                   sampler = 'plain', rng = globalRandom,
+                   checkpoint = None, checkpointInterval = 60.0):
+    printBellSweep([delta_φ], runLength, engine, report, workers,
+                   tolerance, sampler, rng, checkpoint, checkpointInterval)
+
+def printBellSweep(deltas, runLength = 100000, engine = 'python',
+                   report = None, workers = 1, tolerance = None,
+                   sampler = 'plain', rng = globalRandom,
+                   checkpoint = None, checkpointInterval = 60.0):
+    results = sweepBellTests(deltas, runLength, engine, report, workers,
+                             tolerance, sampler, rng, checkpoint,
+                             checkpointInterval)
+    total = 0
+    for delta_φ in deltas:
+        print(f'')
+        print(f'    φ₂ − φ₁ = {delta_φ / π_180 : 6.2f}°')
+        for i in range(33):
+            φ1 = i * π / 16.0
+            φ2 = φ1 + delta_φ
+            φ1_ = φ1 / π_180
+            φ2_ = φ2 / π_180
+            if tolerance is None:
+                ρ_ = next(results)
+                print(f'    φ₁ = {φ1_:6.2f}°  φ₂ = {φ2_:6.2f}°   ρ est. = {ρ_:8.5f}',
+                      flush = True)
+            else:
+                (ρ_, se, n) = next(results)
+                total += n
+                print(f'    φ₁ = {φ1_:6.2f}°  φ₂ = {φ2_:6.2f}°   ρ est. = {ρ_:8.5f}'
+                      f' ± {se:7.5f}   {n:12d} events', flush = True)
+    if tolerance is not None:
+        print(f'')
+        print(f'    {total} events in all')
     print(f'')
 
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('--engine',
+                        choices = [*engines, 'auto'],
+                        default = os.environ.get('EPRB_ENGINE', 'python'),
+                        help = 'simulate event by event in Python '
+                        '(the default, unless set by the environment '
+                        'variable EPRB_ENGINE), or in bulk with NumPy, '
+                        'or compiled with Numba, or with the fastest '
+                        'of these that can run here (auto), or draw '
+                        'the counts from their distribution')
+    parser.add_argument('--run-length', type = int, default = 100000,
+                        metavar = 'N', help = 'events per estimate, or '
+                        'with --tolerance the most per estimate')
+    parser.add_argument('--tolerance', type = float, metavar = 'SE',
+                        help = 'simulate each estimate until its '
+                        'standard error is at most SE')
+    parser.add_argument('--progress', action = 'store_true',
+                        help = 'print intermediate estimates to '
+                        'standard error')
+    parser.add_argument('--sampler', choices = samplers,
+                        default = 'plain',
+                        help = 'how the Python engine draws its random '
+                        'numbers (default plain)')
+    parser.add_argument('--variance-report', action = 'store_true',
+                        help = 'instead of the sweep, compare the '
+                        'samplers\' errors at equal run length')
+    parser.add_argument('--workers', type = int, default = 1,
+                        metavar = 'N',
+                        help = 'run the estimates on N processes')
+    parser.add_argument('--write-events', metavar = 'FILE',
+                        help = 'instead of the sweep, simulate one run '
+                        'at --angles and save its events to FILE')
+    parser.add_argument('--angles', type = float, nargs = 2,
+                        default = [0.0, 22.5], metavar = ('PHI1', 'PHI2'),
+                        help = 'the angles in degrees for --write-events '
+                        '(default 0 22.5)')
+    parser.add_argument('--read-events', nargs = '+', metavar = 'FILE',
+                        help = 'instead of the sweep, estimate ρ from '
+                        'saved event files')
+    parser.add_argument('--checkpoint', metavar = 'FILE',
+                        help = 'save the sweep\'s progress to FILE, and '
+                        'resume from FILE if it exists')
+    parser.add_argument('--checkpoint-interval', type = float,
+                        default = 60.0, metavar = 'SECONDS',
+                        help = 'save progress at least this often '
+                        '(default 60)')
+    parser.add_argument('--profile', metavar = 'FILE',
+                        help = 'write the time taken by each stage of '
+                        'the work to FILE, as JSON')
+    parser.add_argument('--profile-memory', action = 'store_true',
+                        help = 'with --profile, trace the peak memory '
+                        'use too (slow)')
+    args = parser.parse_args()
+    if args.engine not in engines and args.engine != 'auto':
+        parser.error(f'unknown engine {args.engine!r} in EPRB_ENGINE')
+    args.engine = resolveEngine(args.engine)
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.tolerance is not None and args.tolerance <= 0:
+        parser.error('--tolerance must be positive')
+    if args.sampler != 'plain' and args.engine != 'python':
+        parser.error('--sampler is for the python engine')
+    if args.write_events is not None and args.engine != 'python':
+        parser.error('only the python engine simulates events')
+    if args.profile_memory and args.profile is None:
+        parser.error('--profile-memory requires --profile')
+    report = (printProgress if args.progress else None)
+    if args.profile is not None:
+        enableProfiling(args.profile_memory)
+
+    rng = Random(0)
+    deltas = [-π_8, π_8, -3 * π_8, 3 * π_8]
+    if args.read_events is not None:
+        printEventFiles(args.read_events)
+    elif args.write_events is not None:
+        (φ1, φ2) = (args.angles[0] * π_180, args.angles[1] * π_180)
+        writeEvents(args.write_events, φ1, φ2, args.run_length,
+                    Simulator(rng.getrandbits(64), sampler = args.sampler))
+        printEventFiles([args.write_events])
+    elif args.variance_report:
+        printVarianceReport(deltas, args.run_length, rng = rng)
+    else:
+        printBellSweep(deltas, args.run_length, args.engine, report,
+                       args.workers, args.tolerance, args.sampler, rng,
+                       args.checkpoint, args.checkpoint_interval)
+    if profiler is not None:
+        profiler.write(args.profile)
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,185 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+"""Benchmarks of the hot paths of the two Python programs: the
+translation in Programming-Languages-Besides-Ada and the simulation
+core of the animation. Run with ‘python -m benchmarks’ from the top
+of the repository; ‘python -m benchmarks --help’ lists the options."""
+
+import importlib.util
+import sys
+import tracemalloc
+from math import pi
+from pathlib import Path
+from random import seed
+from time import perf_counter
+
+top = Path(__file__).resolve().parent.parent
+
+def load_script():
+    """Import Programming-Languages-Besides-Ada/eprb_signal_correlations.py."""
+    path = (top / 'Programming-Languages-Besides-Ada' /
+            'eprb_signal_correlations.py')
+    spec = importlib.util.spec_from_file_location('eprb_signal_correlations',
+                                                  path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+def load_animation():
+    """Import the animation's simulation core, which does not need
+    pyglet."""
+    sys.path.insert(0, str(top / 'Animation' /
+                           'Quantum_Correlations_Visualized'))
+    from Quantum_Correlations_Visualized import simulation
+    return simulation
+
+def measure(function, repeat):
+    """Call function() repeat times. Return the best wall time and the
+    peak memory traced during one further call."""
+    best = float('inf')
+    for i in range(repeat):
+        start = perf_counter()
+        function()
+        best = min(best, perf_counter() - start)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return (best, peak)
+
+def throughput_cases(script, animation):
+    """Yield (name, make) pairs, where make(n) returns a function
+    that processes n events."""
+    φ1 = pi / 5
+    φ2 = φ1 + pi / 8
+
+    yield ('script.collectData',
+           lambda n: lambda: script.collectData(φ1, φ2, n))
+
+    def prepared(n, analyze, as_list=False):
+        data = script.collectData(φ1, φ2, n)
+        if as_list:
+            data = list(data)
+        return lambda: analyze(data)
+    yield ('script.count',
+           lambda n: prepared(n, lambda data: script.count(
+               data, script.Signal.COUNTERCLOCKWISE,
+               script.Tag.CIRCLED_PLUS, script.Tag.CIRCLED_MINUS)))
+    yield ('script.estimate_ρ_fromRawData',
+           lambda n: prepared(n, lambda data:
+                              script.estimate_ρ_fromRawData(data, φ1, φ2)))
+    yield ('script.estimate_ρ_fromRawData(list)',
+           lambda n: prepared(n, lambda data:
+                              script.estimate_ρ_fromRawData(data, φ1, φ2),
+                              as_list=True))
+    yield ('script.estimate_ρ',
+           lambda n: lambda: script.estimate_ρ(φ1, φ2, n))
+    try:
+        script.importNumpy()
+    except ImportError:
+        pass
+    else:
+        yield ('script.estimate_ρ(numpy)',
+               lambda n: lambda: script.estimate_ρ(φ1, φ2, n, 'numpy'))
+    yield ('animation.countData',
+           lambda n: lambda: animation.countData(φ1, φ2, n))
+    yield ('animation.countData_multinomial',
+           lambda n: lambda: animation.countData_multinomial(φ1, φ2, n))
+
+def run_throughput(run_lengths, repeat, select=None):
+    script = load_script()
+    animation = load_animation()
+    results = {}
+    for (name, make) in throughput_cases(script, animation):
+        if select is not None and select not in name:
+            continue
+        results[name] = {}
+        for n in run_lengths:
+            seed(a = 0, version = 2)
+            (seconds, peak) = measure(make(n), repeat)
+            results[name][str(n)] = {
+                'events_per_second': n / seconds,
+                'seconds': seconds,
+                'peak_bytes': peak,
+            }
+    return results
+
+def percentile(sorted_values, q):
+    i = min(len(sorted_values) - 1, round(q * (len(sorted_values) - 1)))
+    return sorted_values[i]
+
+def run_frames(frames):
+    """Time the simulation part of the animation's update, frame by
+    frame, as BellTest.step, in each of its modes."""
+    animation = load_animation()
+    models = {
+        'BellTest.step': lambda: animation.BellTest(pi / 8),
+        'BellTest.step(multinomial)':
+            lambda: animation.BellTest(pi / 8,
+                                       animation.countData_multinomial),
+        'BellTest.step(window)':
+            lambda: animation.BellTest(
+                pi / 8, sliding_window=animation.SlidingWindow()),
+    }
+    results = {}
+    for (name, make_model) in models.items():
+        seed(a = 0, version = 2)
+        model = make_model()
+        latencies = []
+        for i in range(frames):
+            start = perf_counter()
+            model.step(0.05)
+            latencies.append(perf_counter() - start)
+        seed(a = 0, version = 2)
+        model = make_model()
+        tracemalloc.start()
+        for i in range(frames):
+            model.step(0.05)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        latencies.sort()
+        results[name] = {
+            'p50_seconds': percentile(latencies, 0.50),
+            'p90_seconds': percentile(latencies, 0.90),
+            'p99_seconds': percentile(latencies, 0.99),
+            'max_seconds': latencies[-1],
+            'peak_bytes': peak,
+        }
+    return results
+
+def regressions(current, previous, threshold):
+    """List the throughput cases that have slowed by more than the
+    threshold fraction since the previous record."""
+    slower = []
+    for (name, by_length) in current['throughput'].items():
+        for (n, result) in by_length.items():
+            try:
+                before = previous['throughput'][name][n]
+            except KeyError:
+                continue
+            ratio = result['events_per_second'] / before['events_per_second']
+            if ratio < 1.0 - threshold:
+                slower.append((name, n, ratio))
+    return slower
@@ -0,0 +1,124 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+import json
+import platform
+import subprocess
+import sys
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from pathlib import Path
+from . import top, run_throughput, run_frames, regressions
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=top,
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_report(record):
+    print(f'{"case":<40} {"events":>9} {"events/s":>13} {"peak KiB":>10}')
+    for (name, by_length) in record['throughput'].items():
+        for (n, result) in by_length.items():
+            print(f'{name:<40} {n:>9} '
+                  f'{result["events_per_second"]:13.0f} '
+                  f'{result["peak_bytes"] / 1024:10.1f}')
+    print()
+    print(f'{"frame":<40} {"p50 ms":>8} {"p90 ms":>8} {"p99 ms":>8}'
+          f' {"peak KiB":>10}')
+    for (name, result) in record['frames'].items():
+        print(f'{name:<40} {result["p50_seconds"] * 1000:8.3f} '
+              f'{result["p90_seconds"] * 1000:8.3f} '
+              f'{result["p99_seconds"] * 1000:8.3f} '
+              f'{result["peak_bytes"] / 1024:10.1f}')
+
+def main():
+    parser = ArgumentParser(prog='python -m benchmarks',
+                            description='Benchmark the simulations.')
+    parser.add_argument('--run-lengths', type=int, nargs='+',
+                        default=[10000, 100000, 1000000], metavar='N',
+                        help='events per throughput measurement')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='take the best of this many timings')
+    parser.add_argument('--frames', type=int, default=200,
+                        help='frames per update-latency measurement')
+    parser.add_argument('--select', metavar='TEXT',
+                        help='run only the throughput cases whose names '
+                        'contain TEXT')
+    parser.add_argument('--history', type=Path,
+                        default=top / 'benchmarks' / 'history.json',
+                        help='JSON file of earlier results')
+    parser.add_argument('--record', action='store_true',
+                        help='append the results to the history')
+    parser.add_argument('--check', action='store_true',
+                        help='fail if throughput has dropped since the '
+                        'latest result in the history')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='fractional drop that --check tolerates '
+                        '(default 0.2)')
+    parser.add_argument('--json', action='store_true',
+                        help='print the results as JSON')
+    args = parser.parse_args()
+
+    record = {
+        'time': datetime.now(timezone.utc).isoformat(),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'throughput': run_throughput(args.run_lengths, args.repeat,
+                                     args.select),
+        'frames': run_frames(args.frames),
+    }
+    if args.json:
+        json.dump(record, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_report(record)
+
+    history = []
+    if args.history.exists():
+        history = json.loads(args.history.read_text())
+
+    status = 0
+    if args.check:
+        if not history:
+            print(f'{args.history}: no earlier results to check against',
+                  file=sys.stderr)
+        else:
+            for (name, n, ratio) in regressions(record, history[-1],
+                                                args.threshold):
+                print(f'REGRESSION: {name} at {n} events runs at '
+                      f'{ratio:.0%} of its earlier throughput',
+                      file=sys.stderr)
+                status = 1
+
+    if args.record:
+        history.append(record)
+        args.history.write_text(json.dumps(history, ensure_ascii=False,
+                                           indent=2) + '\n')
+    sys.exit(status)
+
+if __name__ == '__main__':
+    main()
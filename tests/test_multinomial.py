@@ -0,0 +1,155 @@
+# This is free and unencumbered software released into the public domain.
+#
+# Anyone is free to copy, modify, publish, use, compile, sell, or
+# distribute this software, either in source code form or as a compiled
+# binary, for any purpose, commercial or non-commercial, and by any
+# means.
+#
+# In jurisdictions that recognize copyright laws, the author or authors
+# of this software dedicate any and all copyright interest in the
+# software to the public domain. We make this dedication for the benefit
+# of the public at large and to the detriment of our heirs and
+# successors. We intend this dedication to be an overt act of
+# relinquishment in perpetuity of all present and future rights to this
+# software under copyright law.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+"""The multinomial samplers of both programs against their per-event
+paths. With fixed seeds the tests are deterministic; the bounds are
+those a correct sampler would exceed with probability about 0.001.
+Run with ‘python -m unittest’ from the top of the repository."""
+
+import unittest
+from math import pi, cos, sin
+from random import Random
+from benchmarks import load_script, load_animation
+
+script = load_script()
+animation = load_animation()
+
+# The 0.999 quantile of the χ² distribution, by degrees of freedom.
+chi2_999 = {1: 10.83, 2: 13.82, 3: 16.27, 4: 18.47, 5: 20.52, 6: 22.46,
+            7: 24.32}
+
+angles = [(0.0, pi / 8), (pi / 5, pi / 5 + 3 * pi / 8),
+          (1.0, 2.5), (0.0, pi / 2), (pi / 2, pi)]
+
+def script_probabilities(ζ1, ζ2):
+    """The cell probabilities in the order of countIndex."""
+    cells = []
+    for (p1, p2) in ((cos(ζ1) ** 2, cos(ζ2) ** 2),
+                     (sin(ζ1) ** 2, sin(ζ2) ** 2)):
+        cells += [0.5 * p1 * p2, 0.5 * p1 * (1 - p2),
+                  0.5 * (1 - p1) * p2, 0.5 * (1 - p1) * (1 - p2)]
+    return cells
+
+def animation_probabilities(ζ1, ζ2):
+    """The cell probabilities in the order of countData."""
+    cells = []
+    for (p1, p2) in ((cos(ζ1) ** 2, sin(ζ2) ** 2),
+                     (sin(ζ1) ** 2, cos(ζ2) ** 2)):
+        cells += [0.5 * p1 * p2, 0.5 * p1 * (1 - p2),
+                  0.5 * (1 - p1) * p2, 0.5 * (1 - p1) * (1 - p2)]
+    return cells
+
+class MultinomialTest:
+    """Draws many short runs from each path and checks the cell
+    totals against the probabilities (goodness of fit), each path's
+    totals against the other's (homogeneity), and the spread of each
+    cell over the runs against the binomial variance. A subclass,
+    also a unittest.TestCase, defines multinomial(ζ1, ζ2, n, rng)
+    and per_event(ζ1, ζ2, n, rng), each returning the eight counts
+    of n events drawn with rng, and probabilities(ζ1, ζ2), the eight
+    cell probabilities in the same order."""
+
+    runs = 2000
+    run_length = 50
+
+    def draw(self, path, ζ1, ζ2, seed):
+        rng = Random(seed)
+        return [path(ζ1, ζ2, self.run_length, rng)
+                for i in range(self.runs)]
+
+    def test_agreement(self):
+        for (k, (ζ1, ζ2)) in enumerate(angles):
+            with self.subTest(ζ1=ζ1, ζ2=ζ2):
+                p = self.probabilities(ζ1, ζ2)
+                multinomial = self.draw(self.multinomial, ζ1, ζ2, k)
+                per_event = self.draw(self.per_event, ζ1, ζ2, 100 + k)
+                for runs in (multinomial, per_event):
+                    for counts in runs:
+                        self.assertEqual(sum(counts), self.run_length)
+                totals = [[sum(counts[i] for counts in runs)
+                           for i in range(8)]
+                          for runs in (multinomial, per_event)]
+                cells = [i for i in range(8) if p[i] > 1e-12]
+                for i in set(range(8)) - set(cells):
+                    self.assertEqual(totals[0][i], 0)
+                    self.assertEqual(totals[1][i], 0)
+                df = len(cells) - 1
+                n = self.runs * self.run_length
+
+                # Goodness of fit of each path.
+                for total in totals:
+                    χ2 = sum((total[i] - n * p[i]) ** 2 / (n * p[i])
+                             for i in cells)
+                    self.assertLess(χ2, chi2_999[df])
+
+                # Homogeneity of the two paths.
+                χ2 = 0.0
+                for i in cells:
+                    expected = (totals[0][i] + totals[1][i]) / 2
+                    if expected > 0:
+                        χ2 += sum((total[i] - expected) ** 2 / expected
+                                  for total in totals)
+                self.assertLess(χ2, chi2_999[df])
+
+                # The variance of each cell over the runs, which only
+                # a faithful multinomial draw gets right.
+                for i in cells:
+                    variance = self.run_length * p[i] * (1 - p[i])
+                    if variance < 1.0:
+                        continue
+                    xs = [counts[i] for counts in multinomial]
+                    mean = sum(xs) / len(xs)
+                    s2 = sum((x - mean) ** 2 for x in xs) / (len(xs) - 1)
+                    self.assertLess(abs(s2 / variance - 1.0), 0.15)
+
+    def test_boundary_angles(self):
+        # log(1 - cos²(π/2)) is 0.0, once a division by zero.
+        for ζ in (0.0, pi / 4, pi / 2, pi, 3 * pi / 2):
+            counts = self.multinomial(ζ, ζ + pi / 2, 10 ** 6, Random(1))
+            self.assertEqual(sum(counts), 10 ** 6)
+
+class ScriptMultinomialTest(MultinomialTest, unittest.TestCase):
+
+    def multinomial(self, ζ1, ζ2, n, rng):
+        return script.countData_multinomial(ζ1, ζ2, n, rng)
+
+    def per_event(self, ζ1, ζ2, n, rng):
+        return tuple(script.tabulate(
+            script.collectData(ζ1, ζ2, n, rng = rng)).counts)
+
+    def probabilities(self, ζ1, ζ2):
+        return script_probabilities(ζ1, ζ2)
+
+class AnimationMultinomialTest(MultinomialTest, unittest.TestCase):
+
+    def multinomial(self, ζ1, ζ2, n, rng):
+        return animation.countData_multinomial(ζ1, ζ2, n, rng)
+
+    def per_event(self, ζ1, ζ2, n, rng):
+        return animation.countData(ζ1, ζ2, n, rng=rng)
+
+    def probabilities(self, ζ1, ζ2):
+        return animation_probabilities(ζ1, ζ2)
+
+if __name__ == '__main__':
+    unittest.main()